@@ -0,0 +1,72 @@
+"""Compare the compiled categoriser with the original per-pattern search.
+
+Usage:
+    python benchmarks/bench_categorize.py [history.csv] [--repeat N]
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.analysis.content_analyzer import ContentAnalyzer
+
+
+def categorize_video_reference(content_patterns, title):
+    """The original implementation: one ``re.search`` per raw pattern."""
+    categories = []
+    title_lower = title.lower()
+
+    if any(re.search(pattern, title) for pattern in content_patterns['Russian Content']['patterns']):
+        return ['Russian Content']
+
+    for category, data in content_patterns.items():
+        if category != 'Russian Content':
+            for pattern in data['patterns']:
+                if re.search(pattern, title_lower):
+                    categories.append(category)
+                    break
+
+    return categories if categories else ['Other']
+
+
+def best_of(func, titles, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = [func(title) for title in titles]
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_file', nargs='?', type=Path,
+                        default=project_root / 'youtube_watch_history.csv')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    titles = pd.read_csv(args.data_file)['Video Title'].tolist()
+    analyzer = ContentAnalyzer()
+
+    ref_seconds, expected = best_of(
+        lambda title: categorize_video_reference(analyzer.content_patterns, title),
+        titles, args.repeat)
+    new_seconds, actual = best_of(analyzer.categorize_video, titles, args.repeat)
+
+    mismatches = sum(a != b for a, b in zip(expected, actual))
+    print(f"titles:     {len(titles):,}")
+    print(f"reference:  {ref_seconds:.3f}s")
+    print(f"compiled:   {new_seconds:.3f}s  (x{ref_seconds / new_seconds:.2f})")
+    print(f"mismatches: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
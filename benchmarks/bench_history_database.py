@@ -0,0 +1,109 @@
+"""Compare filtered queries on the SQLite history store with pandas filtering.
+
+For each query three latencies are reported: the indexed SQLite store,
+pandas filtering of a history that is already in memory, and what such a
+question costs without the store: ``load_history`` followed by the same
+filter. Bulk loading and categorizing the store are timed too.
+
+Usage:
+    python benchmarks/bench_history_database.py [--rows N] [--repeat N]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.synthetic_history import generate_history, write_processed_csv
+from src.analysis.content_analyzer import ContentAnalyzer
+from src.processing.data_processor import load_history, write_history_store
+from src.processing.history_database import HistoryDatabase, history_database_path
+
+
+def pandas_filter(df, masks, analyzer, start=None, end=None, month=None, channel=None,
+                  category=None):
+    """Filter ``df`` in memory with the semantics of ``HistoryDatabase.query``."""
+    timestamps = df['Watch Date & Time']
+    keep = timestamps.notna()
+    if start is not None:
+        keep &= timestamps >= start
+    if end is not None:
+        keep &= timestamps < end
+    if month is not None:
+        year, month_number = map(int, month.split('-'))
+        keep &= (timestamps.dt.year == year) & (timestamps.dt.month == month_number)
+    if channel is not None:
+        keep &= df['Channel Name'] == channel
+    if category is not None:
+        keep &= (masks & (1 << analyzer.category_columns.index(category))) != 0
+    return df[keep]
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_file = Path(tmp_dir) / 'youtube_watch_history.csv'
+        write_processed_csv(generate_history(args.rows), data_file)
+        df = load_history(data_file)
+        write_history_store(df, data_file)
+        analyzer = ContentAnalyzer()
+
+        history_database = HistoryDatabase(history_database_path(data_file))
+        seconds, _ = best_of(lambda: history_database.write(df), 1)
+        print(f"bulk write of {len(df)} rows: {seconds:.2f}s")
+        seconds, _ = best_of(lambda: history_database.categorize(analyzer), 1)
+        print(f"categorize: {seconds:.2f}s")
+        masks = analyzer.categorize_masks(df).to_numpy()
+
+        channels = df['Channel Name'].value_counts()
+        queries = {
+            'two weeks': dict(start='2023-03-01', end='2023-03-15'),
+            'one month': dict(month='2023-03'),
+            'top channel': dict(channel=channels.index[0]),
+            'mid channel': dict(channel=channels.index[len(channels) // 100]),
+            'channel, one year': dict(channel=channels.index[0], start='2022-01-01',
+                                      end='2023-01-01'),
+            'category, one month': dict(category='Gaming', month='2023-03'),
+        }
+
+        print(f"\n{'query':<22} {'rows':>7} {'sqlite':>9} {'pandas':>9} {'load+pandas':>12}")
+        for name, filters in queries.items():
+            sqlite_seconds, result = best_of(lambda: history_database.query(**filters),
+                                             args.repeat)
+            pandas_seconds, expected = best_of(
+                lambda: pandas_filter(df, masks, analyzer, **filters), args.repeat)
+            load_seconds, _ = best_of(
+                lambda: pandas_filter(load_history(data_file), masks, analyzer, **filters),
+                args.repeat)
+            assert len(result) == len(expected), name
+            print(f"{name:<22} {len(result):>7} {sqlite_seconds * 1000:7.1f}ms "
+                  f"{pandas_seconds * 1000:7.1f}ms {load_seconds * 1000:10.1f}ms")
+
+        sqlite_seconds, _ = best_of(lambda: history_database.top_channels(10, month='2023-03'),
+                                    args.repeat)
+        pandas_seconds, _ = best_of(
+            lambda: pandas_filter(df, masks, analyzer, month='2023-03')['Channel Name']
+            .value_counts().head(10), args.repeat)
+        print(f"{'top 10 in a month':<22} {10:>7} {sqlite_seconds * 1000:7.1f}ms "
+              f"{pandas_seconds * 1000:7.1f}ms")
+        history_database.close()
+
+
+if __name__ == "__main__":
+    main()
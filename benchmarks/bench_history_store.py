@@ -0,0 +1,67 @@
+"""Compare loading the processed history from CSV and from the Parquet store.
+
+Usage:
+    python benchmarks/bench_history_store.py [history.csv] [--repeat N]
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.processing.data_processor import history_store_path, write_history_store
+
+
+def load_csv(data_file):
+    df = pd.read_csv(data_file)
+    df['Watch Date & Time'] = pd.to_datetime(df['Watch Date & Time'])
+    return df
+
+
+def load_store(data_file):
+    return pd.read_parquet(history_store_path(data_file))
+
+
+def measure(loader, data_file, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        loader(data_file)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    df = loader(data_file)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, df.memory_usage(deep=True).sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_file', nargs='?', type=Path,
+                        default=project_root / 'youtube_watch_history.csv')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_file = Path(tmp_dir) / args.data_file.name
+        shutil.copy(args.data_file, data_file)
+        write_history_store(pd.read_csv(data_file), data_file)
+
+        print(f"{'source':<10} {'load':>8} {'peak alloc':>12} {'frame size':>12} {'file size':>10}")
+        for label, loader, path in [('csv', load_csv, data_file),
+                                    ('parquet', load_store, history_store_path(data_file))]:
+            seconds, peak, frame_bytes = measure(loader, data_file, args.repeat)
+            print(f"{label:<10} {seconds * 1000:6.0f}ms {peak / 1e6:10.1f}MB "
+                  f"{frame_bytes / 1e6:10.1f}MB {path.stat().st_size / 1e6:8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
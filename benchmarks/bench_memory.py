@@ -0,0 +1,77 @@
+"""Compare the memory of the plain and the compact in-memory history.
+
+The plain frame is what the analysis used to build: object strings for
+titles and channels, plus ``Year``/``Month``/``Weekday`` columns (day names
+as strings) and a list of category names per row. The compact frame is
+what ``load_history`` and ``AnalysisContext`` now hold: categorical titles
+and channels, small-integer date parts and one category bitmask per row.
+
+Usage:
+    python benchmarks/bench_memory.py [--rows N]
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.synthetic_history import generate_history, write_processed_csv
+from src.analysis.content_analyzer import ContentAnalyzer
+from src.analysis.context import AnalysisContext
+from src.processing.data_processor import load_history
+
+
+def plain_frame(data_file, masks, category_columns):
+    df = pd.read_csv(data_file)
+    df['Watch Date & Time'] = pd.to_datetime(df['Watch Date & Time'])
+    df['Year'] = df['Watch Date & Time'].dt.year
+    df['Month'] = df['Watch Date & Time'].dt.month
+    df['Weekday'] = df['Watch Date & Time'].dt.day_name()
+    names = {mask: [column for bit, column in enumerate(category_columns) if mask >> bit & 1]
+             for mask in np.unique(masks)}
+    df['Categories'] = [list(names[mask]) for mask in masks]
+    return df
+
+
+def compact_frame(data_file, analyzer):
+    context = AnalysisContext(load_history(data_file), analyzer=analyzer)
+    return context.df.assign(
+        Year=context.years,
+        Month=context.months,
+        Weekday=context.weekdays,
+        Categories=context.category_masks,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=3_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_file = Path(tmp_dir) / 'youtube_watch_history.csv'
+        write_processed_csv(generate_history(args.rows), data_file)
+
+        analyzer = ContentAnalyzer()
+        compact = compact_frame(data_file, analyzer)
+        plain = plain_frame(data_file, compact['Categories'].to_numpy(),
+                            analyzer.category_columns)
+
+    usage = pd.DataFrame({
+        'plain MB': plain.memory_usage(deep=True, index=False) / 2**20,
+        'compact MB': compact.memory_usage(deep=True, index=False) / 2**20,
+    })
+    usage.loc['Total'] = usage.sum()
+    usage['ratio'] = usage['plain MB'] / usage['compact MB']
+    print(f"{args.rows} rows, dtypes: "
+          + ', '.join(f"{column}={dtype}" for column, dtype in compact.dtypes.items()))
+    print(usage.round(1).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Measure how parallel HTML parsing scales with the number of workers.
+
+The bundled export is enlarged by repeating its entries ``--scale`` times.
+
+Usage:
+    python benchmarks/bench_parallel_parse.py [archive.zip] [--scale N] [--max-workers N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.processing.data_processor import OUTER_CELL_MARKER, YouTubeHistoryProcessor, open_history
+
+
+def enlarge_export(source, target, scale):
+    """Write a copy of ``source`` whose entries are repeated ``scale`` times."""
+    with open_history(source) as file:
+        html_bytes = file.read()
+    first = html_bytes.find(OUTER_CELL_MARKER)
+    last = html_bytes.rfind(b'</div></body>')
+    header, entries, footer = html_bytes[:first], html_bytes[first:last], html_bytes[last:]
+    with open(target, 'wb') as file:
+        file.write(header)
+        for _ in range(scale):
+            file.write(entries)
+        file.write(footer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('archive', nargs='?', type=Path,
+                        default=project_root / 'watch_history.html.zip')
+    parser.add_argument('--scale', type=int, default=4)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        html_file = Path(tmp_dir) / 'watch_history.html'
+        output_file = Path(tmp_dir) / 'history.csv'
+        enlarge_export(args.archive, html_file, args.scale)
+        print(f"Synthetic export: {html_file.stat().st_size / 1e6:.0f} MB")
+
+        baseline = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            df = YouTubeHistoryProcessor().process_history(html_file, output_file, workers=workers)
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            print(f"workers={workers:<3} {seconds:7.2f}s  {len(df) / seconds:10,.0f} rows/s  "
+                  f"speedup x{baseline / seconds:.2f}")
+
+
+if __name__ == "__main__":
+    main()
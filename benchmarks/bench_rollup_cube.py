@@ -0,0 +1,85 @@
+"""Compare ad-hoc slices from the rollup cube with recomputing them from the history.
+
+The cube is built once from a synthetic history and saved; each slice is
+then timed from the loaded cube, and from the history the way it had to
+be answered before: ``load_history``, categorize, group. The first
+category slice also unpacks the cube's category bitmasks, which later
+slices reuse.
+
+Usage:
+    python benchmarks/bench_rollup_cube.py [--rows N] [--rows-per-channel N]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks import synthetic_history
+from benchmarks.synthetic_history import generate_history, write_processed_csv
+from src.analysis.content_analyzer import ContentAnalyzer
+from src.analysis.context import AnalysisContext
+from src.analysis.rollup_cube import RollupCube
+from src.processing.data_processor import load_history
+
+SLICES = [('Category', 'Weekday'), ('Channel Name', 'Year'),
+          ('Category', 'Year', 'Month'), ('Weekday', 'Month')]
+
+
+def from_history(data_file, analyzer, dimensions):
+    """Answer one slice from the raw history, as before the cube."""
+    context = AnalysisContext(load_history(data_file), analyzer=analyzer)
+    frame = context.df.assign(Year=context.years, Month=context.months,
+                              Weekday=context.weekdays, Date=context.timestamps.dt.normalize())
+    if 'Category' in dimensions:
+        exploded = context.exploded_categories
+        frame = frame.iloc[exploded['Row']].assign(Category=exploded['Category'].to_numpy())
+    return frame.groupby(list(dimensions), observed=True).size()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--rows-per-channel', type=int, default=200,
+                        help='history rows per distinct channel; real histories '
+                             'repeat channels far more than the generator default')
+    args = parser.parse_args()
+
+    synthetic_history.ROWS_PER_CHANNEL = args.rows_per_channel
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_file = Path(tmp_dir) / 'youtube_watch_history.csv'
+        write_processed_csv(generate_history(args.rows), data_file)
+        analyzer = ContentAnalyzer(cache_path=Path(tmp_dir) / 'categories.sqlite')
+
+        start = time.perf_counter()
+        cube = RollupCube.from_context(AnalysisContext(load_history(data_file),
+                                                       analyzer=analyzer))
+        cube.save(Path(tmp_dir) / 'rollup_cube.parquet')
+        print(f"built a {len(cube)}-row cube from {args.rows} views "
+              f"in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        cube = RollupCube.load(Path(tmp_dir) / 'rollup_cube.parquet')
+        print(f"loaded it in {(time.perf_counter() - start) * 1000:.0f}ms\n")
+
+        print(f"{'slice':<32} {'cells':>7} {'cube':>9} {'history':>9}")
+        for dimensions in SLICES:
+            start = time.perf_counter()
+            from_cube = cube.rollup(*dimensions)
+            cube_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            expected = from_history(data_file, analyzer, dimensions)
+            history_seconds = time.perf_counter() - start
+            # Categories come in column order from the cube, by name from the history
+            assert from_cube.sort_index().to_dict() == expected.sort_index().to_dict(), dimensions
+
+            print(f"{' × '.join(dimensions):<32} {len(from_cube):>7} "
+                  f"{cube_seconds * 1000:7.1f}ms {history_seconds * 1000:7.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Time session reconstruction against a per-view Python loop.
+
+Sessions are built from a synthetic history with ``build_sessions``; the
+loop walks the views in time order the straightforward way and runs on
+the first ``--sample`` views only, since it is far too slow for the full
+history. Both must agree on that sample.
+
+Usage:
+    python benchmarks/bench_sessions.py [--rows N] [--sample N] [--gap MINUTES]
+"""
+import argparse
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.synthetic_history import generate_history
+from src.analysis.content_analyzer import ContentAnalyzer
+from src.analysis.context import AnalysisContext
+from src.analysis.sessions import build_sessions
+from src.processing.data_processor import compact_history
+
+
+def sessions_loop(context, gap):
+    """Reconstruct sessions one view at a time, as a reference."""
+    order = np.argsort(context.timestamps.to_numpy(), kind='stable')
+    timestamps = context.timestamps.to_numpy()[order]
+    channels = context.df['Channel Name'].astype(str).to_numpy()[order]
+    matrix = context.category_matrix.to_numpy()[order]
+    columns = context.analyzer.category_columns
+
+    sessions, current = [], None
+    for i in range(len(order)):
+        if current is None or timestamps[i] - current['end'] > gap:
+            if current is not None:
+                sessions.append(current)
+            current = {'start': timestamps[i], 'end': timestamps[i], 'videos': 0,
+                       'channels': Counter(), 'categories': np.zeros(len(columns), int)}
+        current['end'] = timestamps[i]
+        current['videos'] += 1
+        current['channels'][channels[i]] += 1
+        current['categories'] += matrix[i]
+    if current is not None:
+        sessions.append(current)
+
+    rows = []
+    for session in sessions:
+        channel, views = session['channels'].most_common(1)[0]
+        rows.append({
+            'start': session['start'],
+            'end': session['end'],
+            'minutes': (session['end'] - session['start']) / pd.Timedelta(minutes=1),
+            'videos': session['videos'],
+            'dominant_channel': channel,
+            'dominant_channel_share': views / session['videos'],
+            'dominant_category': columns[int(np.argmax(session['categories']))],
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=3_000_000)
+    parser.add_argument('--sample', type=int, default=100_000)
+    parser.add_argument('--gap', type=float, default=30, metavar='MINUTES')
+    args = parser.parse_args()
+    gap = pd.Timedelta(minutes=args.gap)
+
+    history = compact_history(generate_history(args.rows))
+    analyzer = ContentAnalyzer()
+    context = AnalysisContext(history, analyzer=analyzer)
+    start = time.perf_counter()
+    context.category_masks
+    print(f"categorized {args.rows} views in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    sessions = build_sessions(context, gap)
+    seconds = time.perf_counter() - start
+    print(f"build_sessions: {len(sessions)} sessions from {args.rows} views "
+          f"in {seconds:.2f}s")
+
+    sample = AnalysisContext(history.iloc[:args.sample], analyzer=analyzer)
+    start = time.perf_counter()
+    expected = sessions_loop(sample, gap)
+    loop_seconds = time.perf_counter() - start
+    print(f"loop:           {len(expected)} sessions from {len(sample)} views "
+          f"in {loop_seconds:.2f}s "
+          f"(~{loop_seconds * args.rows / len(sample):.0f}s for {args.rows})")
+    pd.testing.assert_frame_equal(build_sessions(sample, gap), expected, check_dtype=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Time every hot path of the pipeline on synthetic histories of several sizes.
+
+For each size a synthetic export and processed CSV are generated (see
+``synthetic_history.py``), then ingestion, date conversion,
+categorization, content analysis, every ``ContentAnalyzer._analyze_*`` step
+and every visualizer method are timed. Each analysis step gets a fresh
+context, so its time includes the aggregates it needs. Outputs go to a
+temporary directory, never to ``results/``.
+
+Usage:
+    python benchmarks/bench_suite.py [--rows 30000 300000 3000000] [--only NAME]
+                                     [--repeat N] [--json results.json]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.synthetic_history import (generate_history, russian_timestamp,
+                                          write_processed_csv, write_takeout_html)
+from src.analysis.content_analyzer import ContentAnalyzer
+from src.analysis.context import AnalysisContext
+from src.analysis.visualizer import YouTubeHistoryVisualizer
+from src.processing.data_processor import YouTubeHistoryProcessor, load_history
+
+ANALYSIS_STEPS = ['_analyze_time_patterns', '_analyze_categories',
+                  '_analyze_channels', '_analyze_trends', '_analyze_sessions']
+# _analyze_categories runs first and writes the category_stats.csv that
+# plot_category_distribution and analyze_category_correlations read.
+VISUALIZER_STEPS = ['generate_basic_stats', 'generate_channel_stats', 'plot_daily_views',
+                    'plot_top_channels', 'plot_weekly_patterns', 'plot_monthly_trends',
+                    'plot_category_distribution', 'create_monthly_heatmap',
+                    'analyze_category_correlations', 'analyze_seasonal_patterns']
+
+
+def benchmarks(work_dir, history, sample):
+    """Yield ``(name, rows, function)`` for every timed step."""
+    html_file = work_dir / 'watch_history.html'
+    data_file = work_dir / 'youtube_watch_history.csv'
+    stats_dir = work_dir / 'results' / 'stats'
+    figures_dir = work_dir / 'results' / 'figures'
+    stats_dir.mkdir(parents=True, exist_ok=True)
+    figures_dir.mkdir(parents=True, exist_ok=True)
+
+    def process_history():
+        YouTubeHistoryProcessor().process_history(html_file, work_dir / 'processed.csv',
+                                                  streaming=True, store=False)
+    yield 'process_history', len(history), process_history
+
+    raw_dates = [russian_timestamp(timestamp)
+                 for timestamp in history['Watch Date & Time']]
+
+    def convert_russian_date():
+        processor = YouTubeHistoryProcessor()
+        for raw in raw_dates[:sample]:
+            processor.convert_russian_date(raw)
+    yield 'convert_russian_date', min(sample, len(raw_dates)), convert_russian_date
+
+    def convert_russian_dates():
+        YouTubeHistoryProcessor().convert_russian_dates(raw_dates)
+    yield 'convert_russian_dates', len(raw_dates), convert_russian_dates
+
+    df = load_history(data_file)
+    titles = df['Video Title'].tolist()
+
+    def categorize_video():
+        analyzer = ContentAnalyzer()
+        for title in titles[:sample]:
+            analyzer.categorize_video(title)
+    yield 'categorize_video', min(sample, len(titles)), categorize_video
+
+    yield 'analyze_content', len(df), lambda: ContentAnalyzer().analyze_content(df)
+
+    def fresh_context():
+        return AnalysisContext(df, analyzer=ContentAnalyzer())
+
+    for name in ANALYSIS_STEPS:
+        def step(name=name):
+            getattr(ContentAnalyzer(), name)(fresh_context(), stats_dir, figures_dir)
+        yield name, len(df), step
+
+    for name in VISUALIZER_STEPS:
+        def step(name=name):
+            visualizer = YouTubeHistoryVisualizer(context=fresh_context())
+            visualizer.stats_dir, visualizer.figures_dir = stats_dir, figures_dir
+            getattr(visualizer, name)()
+        yield name, len(df), step
+
+
+def check_round_trip(work_dir):
+    """Check that parsing the generated export gives back the generated CSV.
+
+    Views that ``process_history`` drops would silently shrink the
+    workload every later step is timed on.
+    """
+    processor = YouTubeHistoryProcessor()
+    parsed = processor.process_history(work_dir / 'watch_history.html',
+                                       work_dir / 'round_trip.csv', streaming=True, store=False)
+    expected = load_history(work_dir / 'youtube_watch_history.csv')
+    assert processor.date_failures == 0, \
+        f"{processor.date_failures} synthetic timestamps failed to parse"
+    assert len(parsed) == len(expected), \
+        f"parsed {len(parsed)} of {len(expected)} synthetic views"
+    assert (parsed['Watch Date & Time'].to_numpy()
+            == expected['Watch Date & Time'].to_numpy()).all(), "synthetic timestamps differ"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[30_000, 300_000],
+                        help='history sizes to benchmark')
+    parser.add_argument('--only', nargs='+', default=None,
+                        help='only run steps whose name contains one of these strings')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='runs per step; the fastest is reported')
+    parser.add_argument('--sample', type=int, default=20_000,
+                        help='rows fed to the per-row functions convert_russian_date '
+                             'and categorize_video')
+    parser.add_argument('--json', type=Path, default=None,
+                        help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    matplotlib.use('Agg')
+    results = []
+    print(f"{'step':<32} {'rows':>9} {'seconds':>9} {'µs/row':>9}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            work_dir = Path(tmp_dir)
+            history = generate_history(rows)
+            write_takeout_html(history, work_dir / 'watch_history.html')
+            write_processed_csv(history, work_dir / 'youtube_watch_history.csv')
+            check_round_trip(work_dir)
+
+            for name, step_rows, func in benchmarks(work_dir, history, args.sample):
+                if args.only and not any(part in name for part in args.only):
+                    continue
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    func()
+                    timings.append(time.perf_counter() - start)
+                seconds = min(timings)
+                results.append({'step': name, 'size': rows, 'rows': step_rows,
+                                'seconds': seconds})
+                print(f"{name:<32} {step_rows:>9} {seconds:>9.3f} "
+                      f"{seconds / step_rows * 1e6:>9.2f}", flush=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Compare reading a zipped export in place against extract-then-parse.
+
+Usage:
+    python benchmarks/bench_zip_ingest.py [archive.zip] [--streaming] [--repeat N]
+"""
+import argparse
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.processing.data_processor import YouTubeHistoryProcessor, find_history_member
+
+
+def extract_then_parse(archive_path, output_file, streaming):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with zipfile.ZipFile(archive_path) as archive:
+            html_file = archive.extract(find_history_member(archive), tmp_dir)
+        return YouTubeHistoryProcessor().process_history(html_file, output_file, streaming=streaming)
+
+
+def parse_from_zip(archive_path, output_file, streaming):
+    return YouTubeHistoryProcessor().process_history(archive_path, output_file, streaming=streaming)
+
+
+def best_of(func, repeat, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('archive', nargs='?', type=Path,
+                        default=project_root / 'watch_history.html.zip')
+    parser.add_argument('--streaming', action='store_true')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    size_mb = args.archive.stat().st_size / 1e6
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_file = Path(tmp_dir) / 'history.csv'
+        for label, func in [('extract-then-parse', extract_then_parse),
+                            ('parse-from-zip', parse_from_zip)]:
+            seconds, rows = best_of(func, args.repeat, args.archive, output_file, args.streaming)
+            print(f"{label:<20} {seconds:7.2f}s  {rows / seconds:10,.0f} rows/s  "
+                  f"{size_mb / seconds:6.1f} MB/s (compressed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Generate a synthetic YouTube watch history of any size.
+
+Writes a Takeout-style HTML export (optionally zipped) and the matching
+processed CSV. Titles mix Latin and Cyrillic templates built from the
+vocabulary the category patterns look for, channel popularity follows a
+Zipf-like law, and views lean towards evenings and weekends.
+
+Usage:
+    python benchmarks/synthetic_history.py OUT_DIR [--rows N] [--seed N] [--zip]
+"""
+import argparse
+import html
+import sys
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.processing.data_processor import CONTENT_CELL_CLASS
+
+# Genitive month abbreviations as written by a Russian-locale export
+RUSSIAN_MONTHS = ['янв.', 'февр.', 'мар.', 'апр.', 'мая', 'июн.',
+                  'июл.', 'авг.', 'сент.', 'окт.', 'нояб.', 'дек.']
+CYRILLIC_SHARE = 0.33
+REWATCH_SHARE = 0.1
+CHANNEL_SKEW = 0.75
+ROWS_PER_CHANNEL = 3
+
+LATIN_TEMPLATES = [
+    'How to {verb} {noun} in {n} minutes',
+    '{noun} tutorial for beginners - part {n}',
+    '{game} gameplay walkthrough #{n}',
+    '{game} funny moments #{n} #shorts',
+    '{artist} - {song} (Official Music Video)',
+    '{artist} - {song} [lyrics]',
+    'Top {n} {noun} of {year}',
+    '{noun} explained in {n} seconds | {topic} basics',
+    'I tried {noun} for {n} days',
+    '{topic} podcast #{n}: {noun} with {artist}',
+    '{noun} review after {n} hours - is it worth it?',
+    'Epic {song} compilation vol. {n} #shorts',
+]
+CYRILLIC_TEMPLATES = [
+    'Как {verb_ru} {noun_ru} за {n} минут',
+    '{noun_ru} — обзор и мнение спустя {n} дней',
+    'Лучшие моменты {game} #{n}',
+    'ПРИКОЛЫ {n} минут смеха',
+    '{artist_ru} — {song_ru} (премьера клипа)',
+    'Урок {n}: {noun_ru} для начинающих',
+    '{game} прохождение #{n}',
+    'Новости {topic_ru} за неделю — выпуск {n}',
+]
+WORDS = {
+    'verb': ['learn', 'build', 'cook', 'fix', 'draw', 'code', 'play', 'train', 'edit', 'install'],
+    'noun': ['python', 'guitar', 'pasta', 'bike', 'portrait', 'algorithm', 'chess', 'workout',
+             'video', 'linux', 'react', 'budget', 'garden', 'camera', 'football'],
+    'game': ['Minecraft', 'Valorant', 'PUBG', 'GTA V', 'FIFA 23', 'Clash Royale', 'Fortnite',
+             'CS:GO', 'Mobile Legends', 'Dota 2'],
+    'artist': ['Imagine Dragons', 'Eminem', 'Trap Nation', 'Epic Music Novus', 'Hans Zimmer',
+               'Billie Eilish', 'The Weeknd', 'Two Steps From Hell'],
+    'song': ['Believer', 'Lose Yourself', 'Time', 'Blinding Lights', 'Victory', 'Heart of Courage',
+             'Bad Guy', 'Thunder'],
+    'topic': ['science', 'history', 'tech', 'finance', 'physics', 'biology', 'fitness', 'gaming'],
+    'verb_ru': ['приготовить', 'собрать', 'выучить', 'починить', 'нарисовать', 'настроить'],
+    'noun_ru': ['борщ', 'компьютер', 'английский', 'велосипед', 'портрет', 'телефон', 'гитару'],
+    'artist_ru': ['Рожков', 'Баста', 'Макс Корж', 'Ёлка', 'Сплин'],
+    'song_ru': ['Метель', 'Сансара', 'Мотылёк', 'Прованс', 'Выхода нет'],
+    'topic_ru': ['футбола', 'науки', 'технологий', 'игр', 'космоса'],
+}
+CHANNEL_WORDS = ['Epic', 'Daily', 'Slow', 'Pro', 'Quick', 'Music', 'Gaming', 'Tech', 'Chef',
+                 'Science', 'Story', 'Trap', 'Motion', 'Lab', 'Club', 'Nation', 'Academy', 'Show']
+CHANNEL_WORDS_RU = ['Рожков', 'АМКАЛ', 'Кухня', 'Наука', 'Игры', 'Студия', 'Клуб', 'Канал']
+# Relative likelihood of a view in each hour of the day, evening-heavy
+HOUR_WEIGHTS = np.array([3, 2, 1, 1, 1, 1, 1, 2, 3, 3, 4, 4,
+                         5, 5, 5, 5, 6, 7, 8, 9, 10, 10, 8, 5], dtype=float)
+
+
+def _fill(templates, rows, rng):
+    """Render ``rows`` titles from randomly chosen templates."""
+    choices = {name: rng.choice(words, size=rows) for name, words in WORDS.items()}
+    numbers = rng.integers(1, 1000, size=rows)
+    years = rng.integers(2015, 2025, size=rows)
+    template_ids = rng.integers(len(templates), size=rows)
+    return [
+        templates[t].format(n=numbers[i], year=years[i],
+                            **{name: values[i] for name, values in choices.items()})
+        for i, t in enumerate(template_ids)
+    ]
+
+
+def _channels(count, rng):
+    """Return ``count`` distinct channel names, most popular first."""
+    latin = rng.choice(CHANNEL_WORDS, size=(count, 2))
+    cyrillic = rng.choice(CHANNEL_WORDS_RU, size=count)
+    is_cyrillic = rng.random(count) < CYRILLIC_SHARE
+    return [
+        f"{cyrillic[i]} {i}" if is_cyrillic[i] else f"{latin[i, 0]} {latin[i, 1]} {i}"
+        for i in range(count)
+    ]
+
+
+def generate_history(rows, seed=0, start='2020-01-01', end='2024-11-30'):
+    """Return a synthetic history frame, newest view first like an export.
+
+    ``Watch Date & Time`` holds full timestamps; channel popularity is
+    Zipf-distributed and a share of the views are rewatches.
+    """
+    rng = np.random.default_rng(seed)
+
+    is_cyrillic = rng.random(rows) < CYRILLIC_SHARE
+    titles = np.empty(rows, dtype=object)
+    titles[~is_cyrillic] = _fill(LATIN_TEMPLATES, int((~is_cyrillic).sum()), rng)
+    titles[is_cyrillic] = _fill(CYRILLIC_TEMPLATES, int(is_cyrillic.sum()), rng)
+    rewatched = rng.random(rows) < REWATCH_SHARE
+    titles[rewatched] = titles[rng.integers(rows, size=int(rewatched.sum()))]
+
+    channel_names = np.array(_channels(max(rows // ROWS_PER_CHANNEL, 1), rng), dtype=object)
+    popularity = 1.0 / np.arange(1, len(channel_names) + 1) ** CHANNEL_SKEW
+    channels = channel_names[rng.choice(len(channel_names), size=rows,
+                                        p=popularity / popularity.sum())]
+
+    days = pd.date_range(start, end, freq='D')
+    day_weights = np.where(days.dayofweek >= 5, 1.3, 1.0)
+    day_index = rng.choice(len(days), size=rows, p=day_weights / day_weights.sum())
+    hours = rng.choice(24, size=rows, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    seconds = hours * 3600 + rng.integers(3600, size=rows)
+    timestamps = days[day_index] + pd.to_timedelta(seconds, unit='s')
+
+    history = pd.DataFrame({
+        'Video Title': titles,
+        'Channel Name': channels,
+        'Watch Date & Time': timestamps,
+    })
+    return history.sort_values('Watch Date & Time', ascending=False, kind='stable',
+                               ignore_index=True)
+
+
+def russian_timestamp(timestamp):
+    month = RUSSIAN_MONTHS[timestamp.month - 1]
+    return f"{timestamp.day} {month} {timestamp.year}\u202fг., {timestamp:%H:%M:%S} GMT+03:00"
+
+
+def _entry(title, channel, timestamp):
+    return (
+        '<div class="outer-cell mdl-cell mdl-cell--12-col mdl-shadow--2dp"><div class="mdl-grid">'
+        '<div class="header-cell mdl-cell mdl-cell--12-col"><p class="mdl-typography--title">'
+        f'YouTube<br></p></div><div class="{CONTENT_CELL_CLASS}">Просмотрено видео '
+        f'<a href="https://www.youtube.com/watch?v=synthetic">{html.escape(title)}</a><br>'
+        f'<a href="https://www.youtube.com/channel/synthetic">{html.escape(channel)}</a><br>'
+        f'{russian_timestamp(timestamp)}</div>'
+        f'<div class="{CONTENT_CELL_CLASS} mdl-typography--text-right"></div>'
+        '<div class="content-cell mdl-cell mdl-cell--12-col mdl-typography--caption">'
+        '<b>Продукты:</b><br>&emsp;YouTube<br></div></div></div>'
+    )
+
+
+def write_takeout_html(history, path):
+    """Write ``history`` as a watch history page, zipped if ``path`` ends in .zip."""
+    path = Path(path)
+    if path.suffix == '.zip':
+        with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            with archive.open('watch_history.html', 'w', force_zip64=True) as file:
+                _write_page(history, file)
+    else:
+        with open(path, 'wb') as file:
+            _write_page(history, file)
+
+
+def _write_page(history, file):
+    file.write('<html><head><title>История моих действий</title></head>'
+               '<body><div class="mdl-grid">'.encode('utf-8'))
+    rows = zip(history['Video Title'], history['Channel Name'], history['Watch Date & Time'])
+    batch = []
+    for row in rows:
+        batch.append(_entry(*row))
+        if len(batch) == 10_000:
+            file.write(''.join(batch).encode('utf-8'))
+            batch = []
+    file.write(''.join(batch).encode('utf-8'))
+    file.write('</div></body></html>'.encode('utf-8'))
+
+
+def write_processed_csv(history, path):
+    """Write ``history`` in the format written by ``process_history``."""
+    history.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('out_dir', type=Path)
+    parser.add_argument('--rows', type=int, default=30_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--zip', action='store_true', help='zip the HTML export')
+    args = parser.parse_args()
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    history = generate_history(args.rows, seed=args.seed)
+    html_file = args.out_dir / ('watch_history.html.zip' if args.zip else 'watch_history.html')
+    write_takeout_html(history, html_file)
+    write_processed_csv(history, args.out_dir / 'youtube_watch_history.csv')
+    print(f"Wrote {args.rows} rows to {html_file} and youtube_watch_history.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import hashlib
+import json
+from pathlib import Path
+
+
+def file_digest(path):
+    """Return the blake2b hex digest of a file's contents, or None if missing."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def step_key(**inputs):
+    """Combine the fingerprints of everything a step depends on into one key."""
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode('utf-8')).hexdigest()
+
+
+class BuildCache:
+    """Content-addressed record of which report outputs are up to date.
+
+    For each step the cache keeps the key of the inputs it last ran with
+    and the digests of the files it produced, in a JSON manifest. A step
+    is fresh when its key is unchanged and its outputs are still on disk
+    with the recorded contents, so deleting or editing an output file also
+    triggers a rebuild.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def is_fresh(self, step, key, outputs):
+        entry = self.entries.get(step)
+        if entry is None or entry['key'] != key:
+            return False
+        return all(entry['outputs'].get(str(output)) == file_digest(output)
+                   for output in outputs)
+
+    def record(self, step, key, outputs):
+        self.entries[step] = {
+            'key': key,
+            'outputs': {str(output): file_digest(output) for output in outputs}
+        }
+
+    def forget(self, step):
+        self.entries.pop(step, None)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(self.entries, f, indent=4, sort_keys=True)
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+
+def patterns_fingerprint(content_patterns, category_columns):
+    """Return a stable fingerprint of ``content_patterns`` and the column order.
+
+    Bit ``j`` of a cached mask stands for ``category_columns[j]``, so the
+    ordered columns are part of the fingerprint: reordering the categories
+    invalidates every mask built with the old order.
+    """
+    payload = json.dumps({'columns': list(category_columns), 'patterns': content_patterns},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def pack_categories(matrix):
+    """Pack a boolean row × category matrix into one bitmask per row.
+
+    Bit ``j`` of a mask is set when column ``j`` is. The result uses the
+    smallest unsigned integer type that holds all the columns.
+    """
+    matrix = np.asarray(matrix, dtype=bool)
+    dtype = np.min_scalar_type((1 << matrix.shape[1]) - 1)
+    weights = np.int64(1) << np.arange(matrix.shape[1], dtype=np.int64)
+    return (matrix.astype(np.int64) @ weights).astype(dtype)
+
+
+def unpack_categories(masks, n_columns):
+    """Inverse of ``pack_categories``: expand bitmasks to a boolean matrix."""
+    masks = np.asarray(masks, dtype=np.int64)
+    return ((masks[:, None] >> np.arange(n_columns)) & 1).astype(bool)
+
+
+def title_hash(title):
+    """Return a 64-bit signed integer hash of a video title."""
+    digest = hashlib.blake2b(title.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+class CategoryCache:
+    """Persistent title → categories cache backed by SQLite.
+
+    Each title is stored as a bitmask over the category columns, keyed by
+    the hash of the title. The fingerprint of the patterns the titles were
+    classified with is kept alongside; when it changes the cache is
+    cleared, so editing ``content_patterns`` invalidates it automatically.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)'
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS categories '
+                '(title_hash INTEGER PRIMARY KEY, mask INTEGER NOT NULL)'
+            )
+        self.misses = 0
+
+    def _validate(self, fingerprint):
+        """Clear the cache if it was built with different patterns."""
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if row is None or row[0] != fingerprint:
+            with self.connection:
+                self.connection.execute('DELETE FROM categories')
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (fingerprint,)
+                )
+
+    def categorize(self, titles, fingerprint, n_columns, match_titles):
+        """Return the boolean category matrix for ``titles``.
+
+        Titles missing from the cache are classified with ``match_titles``,
+        which must return a boolean array of shape ``(len(titles), n_columns)``,
+        and are written back.
+        """
+        self._validate(fingerprint)
+        hashes = [title_hash(title) for title in titles]
+
+        # Look up only the requested hashes, through a keyed temp table, so
+        # the cost follows the titles asked for rather than the cache size
+        masks = np.full(len(hashes), -1, dtype=np.int64)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TEMP TABLE requested (position INTEGER PRIMARY KEY, title_hash INTEGER)'
+            )
+            self.connection.executemany('INSERT INTO requested VALUES (?, ?)', enumerate(hashes))
+            for position, mask in self.connection.execute(
+                'SELECT requested.position, categories.mask FROM requested '
+                'JOIN categories ON categories.title_hash = requested.title_hash'
+            ):
+                masks[position] = mask
+            self.connection.execute('DROP TABLE requested')
+
+        missing = np.flatnonzero(masks < 0)
+        if len(missing):
+            matched = match_titles([titles[i] for i in missing])
+            new_masks = pack_categories(matched).astype(np.int64)
+            masks[missing] = new_masks
+            with self.connection:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO categories VALUES (?, ?)',
+                    zip([hashes[i] for i in missing], new_masks.tolist())
+                )
+
+        self.misses = len(missing)
+        return unpack_categories(masks, n_columns)
+
+    def close(self):
+        self.connection.close()
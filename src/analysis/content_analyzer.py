@@ -1,15 +1,26 @@
 from collections import defaultdict
+import argparse
 import re
 import pandas as pd
-import matplotlib.pyplot as plt
 from pathlib import Path
 import json
-import seaborn as sns
 import calendar
 import numpy as np
 
+from .category_cache import (CategoryCache, pack_categories, patterns_fingerprint,
+                             unpack_categories)
+from .context import AnalysisContext
+from .keywords import SpaceSavingCounter, count_keywords, top_keywords
+from .sessions import (SESSION_GAP, add_session_arguments, build_sessions,
+                       session_gap_from_args, session_summary)
+from ..processing.data_processor import iter_history_chunks, load_history
+from ..profiling import StageProfiler, add_profiling_arguments, profiler_from_args
+
+# Moving average windows in trend_stats.csv, in days; the figures show 7 and 30
+TREND_WINDOWS = (7, 30, 90, 365)
+
 class ContentAnalyzer:
-    def __init__(self):
+    def __init__(self, cache_path=None, profiler=None, session_gap=SESSION_GAP):
         # Content type patterns and their categories
         self.content_patterns = {
             'Educational': {
@@ -117,27 +128,116 @@ class ContentAnalyzer:
             }
         }
 
+        self.category_cache = CategoryCache(cache_path) if cache_path else None
+        self.profiler = profiler or StageProfiler()
+        self.session_gap = pd.Timedelta(session_gap)
+        self.compile_patterns()
+
+    def compile_patterns(self):
+        """Compile each category's patterns into a single alternation.
+
+        Call again after editing ``content_patterns`` on an existing instance.
+        """
+        def combine(patterns):
+            return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+
+        self.russian_regex = combine(self.content_patterns['Russian Content']['patterns'])
+        self.category_regexes = [
+            (category, combine(data['patterns']))
+            for category, data in self.content_patterns.items()
+            if category != 'Russian Content'
+        ]
+        self.category_columns = [category for category, _ in self.category_regexes]
+        self.category_columns += ['Russian Content', 'Other']
+        self.patterns_fingerprint = patterns_fingerprint(self.content_patterns,
+                                                     self.category_columns)
+
     def categorize_video(self, title):
         """Categorize a video based on its title."""
-        categories = []
-        title_lower = title.lower()
-        
         # First check for Russian content
-        if any(re.search(pattern, title) for pattern in self.content_patterns['Russian Content']['patterns']):
+        if self.russian_regex.search(title):
             return ['Russian Content']
         
         # Then check other categories
-        for category, data in self.content_patterns.items():
-            if category != 'Russian Content':  # Skip Russian content check
-                for pattern in data['patterns']:
-                    if re.search(pattern, title_lower):
-                        categories.append(category)
-                        break
+        title_lower = title.lower()
+        categories = [category for category, regex in self.category_regexes
+                      if regex.search(title_lower)]
                     
         return categories if categories else ['Other']
 
-    def analyze_content(self, df):
-        """Analyze content patterns in the dataset."""
+    def _match_titles(self, titles):
+        """Return a boolean title × ``category_columns`` array for ``titles``."""
+        titles = pd.Series(titles, dtype=object)
+
+        # First check for Russian content
+        is_russian = titles.str.contains(self.russian_regex).to_numpy(dtype=bool)
+
+        # Then check other categories on the remaining titles
+        other_titles = titles[~is_russian].str.lower()
+        columns = []
+        for category, regex in self.category_regexes:
+            matches = np.zeros(len(titles), dtype=bool)
+            matches[~is_russian] = other_titles.str.contains(regex).to_numpy(dtype=bool)
+            columns.append(matches)
+        columns.append(is_russian)
+
+        matrix = np.column_stack(columns)
+        return np.column_stack([matrix, ~matrix.any(axis=1)])
+
+    def categorize_masks(self, df):
+        """Return one category bitmask per row of ``df``.
+
+        Bit ``j`` of a row's mask is set when the title belongs to
+        ``category_columns[j]`` (see ``pack_categories``), following the
+        same Russian-first and 'Other' fallback rules as
+        ``categorize_video``. Each distinct title is matched once, and only
+        if it is not already in the category cache.
+        """
+        codes, unique_titles = pd.factorize(df['Video Title'])
+        unique_titles = list(unique_titles)
+        if (codes < 0).any():
+            # Missing titles are categorized like an empty title
+            codes = np.where(codes < 0, len(unique_titles), codes)
+            unique_titles.append('')
+
+        if self.category_cache is not None:
+            matrix = self.category_cache.categorize(
+                unique_titles, self.patterns_fingerprint,
+                len(self.category_columns), self._match_titles
+            )
+        else:
+            matrix = self._match_titles(unique_titles)
+
+        return pd.Series(pack_categories(matrix)[codes], index=df.index, name='Category Mask')
+
+    def categorize_frame(self, df):
+        """Build a boolean video × category matrix for a whole DataFrame.
+
+        Row ``i`` holds the categories ``categorize_video`` returns for the
+        ``i``-th title. Columns follow ``categorize_video`` order, followed
+        by 'Russian Content' and 'Other'.
+        """
+        masks = self.categorize_masks(df)
+        matrix = unpack_categories(masks, len(self.category_columns))
+        return pd.DataFrame(matrix, index=df.index, columns=self.category_columns)
+
+    def get_context(self, data):
+        """Return an ``AnalysisContext`` for a DataFrame, or pass one through."""
+        if isinstance(data, AnalysisContext):
+            if data.analyzer is None:
+                data.analyzer = self
+            return data
+        return AnalysisContext(data, analyzer=self)
+
+    def analyze_content(self, data, keyword_capacity=None, chunk_size=100_000):
+        """Analyze content patterns in the dataset.
+
+        ``data`` is a DataFrame or a shared ``AnalysisContext``.
+
+        With ``keyword_capacity`` set, keywords are counted approximately in
+        chunks of ``chunk_size`` titles with a Space-Saving sketch, so memory
+        stays bounded for very large histories.
+        """
         # Initialize results dictionary
         results = {
             'category_counts': defaultdict(int),
@@ -146,33 +246,48 @@ class ContentAnalyzer:
             'multi_category_videos': 0
         }
 
-        # Process each video
-        for idx, row in df.iterrows():
-            categories = self.categorize_video(row['Video Title'])
-            
-            # Count categories
-            for category in categories:
-                results['category_counts'][category] += 1
-                
-                # Count by month
-                month = pd.to_datetime(row['Watch Date & Time']).strftime('%Y-%m')
-                results['category_by_month'][month][category] += 1
-            
-            # Count multi-category videos
-            if len(categories) > 1:
-                results['multi_category_videos'] += 1
-
-            # Extract and count common keywords
-            words = row['Video Title'].lower().split()
-            for word in words:
-                if len(word) > 3:  # Skip very short words
-                    results['common_keywords'][word] += 1
+        context = self.get_context(data)
+        df = context.df
+
+        # One row per (video, category), with the month of the video
+        exploded = context.exploded_categories
+        rows = exploded['Row'].to_numpy()
+        months = context.periods.dt.strftime('%Y-%m').to_numpy()
+        categories_df = pd.DataFrame({
+            'Month': months[rows],
+            'Category': exploded['Category']
+        })
+
+        # Count categories (first-seen order, as the row-by-row count had)
+        results['category_counts'].update(
+            categories_df['Category'].value_counts(sort=False).to_dict()
+        )
+
+        # Count by month
+        by_month = categories_df.groupby(['Month', 'Category'], sort=False).size()
+        for (month, category), count in by_month.items():
+            results['category_by_month'][month][category] = int(count)
+
+        # Count multi-category videos
+        categories_per_video = np.bincount(rows, minlength=len(df))
+        results['multi_category_videos'] = int((categories_per_video > 1).sum())
+
+        # Extract and count common keywords
+        if keyword_capacity:
+            sketch = SpaceSavingCounter(keyword_capacity)
+            for start in range(0, len(df), chunk_size):
+                sketch.update(df['Video Title'].iloc[start:start + chunk_size])
+            results['common_keywords'].update(sketch.counts)
+        else:
+            results['common_keywords'].update(count_keywords(df['Video Title']))
 
         return results
 
-    def generate_visualizations(self, df):
+    def generate_visualizations(self, data):
         """Generate visualizations for content analysis."""
-        results = self.analyze_content(df)
+        import matplotlib.pyplot as plt
+
+        results = self.analyze_content(data)
         
         # Create figures directory if it doesn't exist
         figures_dir = Path(__file__).parent.parent.parent / 'results' / 'figures'
@@ -212,155 +327,226 @@ class ContentAnalyzer:
             json_results = {
                 'category_counts': dict(results['category_counts']),
                 'multi_category_videos': results['multi_category_videos'],
-                'top_keywords': dict(sorted(results['common_keywords'].items(), 
-                                          key=lambda x: x[1], 
-                                          reverse=True)[:100])
+                'top_keywords': dict(top_keywords(results['common_keywords'], 100))
             }
             json.dump(json_results, f, indent=4)
 
-    def generate_detailed_analysis(self, df):
-        """Generate comprehensive analysis and visualizations."""
+    def generate_detailed_analysis(self, data, figures=True):
+        """Generate comprehensive analysis and visualizations.
+
+        ``data`` is a DataFrame or a shared ``AnalysisContext``. With
+        ``figures=False`` only the stats files are written and matplotlib
+        is never imported.
+        """
+        context = self.get_context(data)
         stats_dir = Path(__file__).parent.parent.parent / 'results' / 'stats'
-        figures_dir = Path(__file__).parent.parent.parent / 'results' / 'figures'
+        figures_dir = None
+        if figures:
+            figures_dir = Path(__file__).parent.parent.parent / 'results' / 'figures'
+            figures_dir.mkdir(parents=True, exist_ok=True)
         
         # Ensure directories exist
         stats_dir.mkdir(parents=True, exist_ok=True)
-        figures_dir.mkdir(parents=True, exist_ok=True)
+
+        rows = len(context)
+        if context.df is not None:  # a chunked context holds aggregates only
+            with self.profiler.stage('detailed_analysis.parse_timestamps', rows=rows):
+                context.timestamps
 
         # 1. Time-based Analysis
-        self._analyze_time_patterns(df, stats_dir, figures_dir)
+        with self.profiler.stage('detailed_analysis.time_patterns', rows=rows):
+            self._analyze_time_patterns(context, stats_dir, figures_dir)
         
         # 2. Content Category Analysis
-        self._analyze_categories(df, stats_dir, figures_dir)
+        if context.df is not None:
+            with self.profiler.stage('detailed_analysis.categorize', rows=rows):
+                context.category_masks
+        with self.profiler.stage('detailed_analysis.categories', rows=rows):
+            self._analyze_categories(context, stats_dir, figures_dir)
         
         # 3. Channel Analysis
-        self._analyze_channels(df, stats_dir, figures_dir)
+        with self.profiler.stage('detailed_analysis.channels', rows=rows):
+            self._analyze_channels(context, stats_dir, figures_dir)
         
         # 4. Trend Analysis
-        self._analyze_trends(df, stats_dir, figures_dir)
+        with self.profiler.stage('detailed_analysis.trends', rows=rows):
+            self._analyze_trends(context, stats_dir, figures_dir)
+
+        # 5. Session Analysis; sessions need every timestamp, not aggregates
+        if context.df is not None:
+            with self.profiler.stage('detailed_analysis.sessions', rows=rows):
+                self._analyze_sessions(context, stats_dir, figures_dir)
 
-    def _analyze_time_patterns(self, df, stats_dir, figures_dir):
+    def _analyze_time_patterns(self, context, stats_dir, figures_dir):
         """Analyze viewing patterns over time."""
-        df['Year'] = pd.to_datetime(df['Watch Date & Time']).dt.year
-        df['Month'] = pd.to_datetime(df['Watch Date & Time']).dt.month
-        df['Weekday'] = pd.to_datetime(df['Watch Date & Time']).dt.day_name()
-        
         # Monthly heatmap data
-        monthly_views = df.groupby(['Year', 'Month']).size().unstack()
+        monthly_views = context.year_month_counts
         
         # Create heatmap
-        plt.figure(figsize=(15, 8))
-        sns.heatmap(monthly_views, cmap='YlOrRd', annot=True, fmt='g')
-        plt.title('Video Viewing Heatmap by Month and Year')
-        plt.ylabel('Year')
-        plt.xlabel('Month')
-        plt.tight_layout()
-        plt.savefig(figures_dir / 'monthly_heatmap.png')
-        plt.close()
+        if figures_dir is not None:
+            import matplotlib.pyplot as plt
+            import seaborn as sns
+
+            plt.figure(figsize=(15, 8))
+            sns.heatmap(monthly_views, cmap='YlOrRd', annot=True, fmt='g')
+            plt.title('Video Viewing Heatmap by Month and Year')
+            plt.ylabel('Year')
+            plt.xlabel('Month')
+            plt.tight_layout()
+            plt.savefig(figures_dir / 'monthly_heatmap.png')
+            plt.close()
 
         # Save time-based statistics
         time_stats = {
-            'yearly_views': df.groupby('Year').size().to_dict(),
-            'monthly_views': df.groupby('Month').size().to_dict(),
-            'weekday_views': df.groupby('Weekday').size().to_dict()
+            'yearly_views': context.yearly_counts.to_dict(),
+            'monthly_views': context.month_of_year_counts.to_dict(),
+            'weekday_views': context.weekday_counts.to_dict()
         }
         
         pd.DataFrame(time_stats).to_csv(stats_dir / 'time_patterns.csv')
 
-    def _analyze_categories(self, df, stats_dir, figures_dir):
+    def _analyze_categories(self, context, stats_dir, figures_dir):
         """Analyze content categories."""
-        # Add categories to DataFrame
-        df['Categories'] = df['Video Title'].apply(self.categorize_video)
-        
-        # Explode categories for videos with multiple categories
-        categories_df = df.explode('Categories')
-        
         # Category counts
-        category_counts = categories_df['Categories'].value_counts()
+        category_counts = context.category_counts
         
         # Create stacked area chart for category evolution
-        category_by_date = pd.crosstab(
-            pd.to_datetime(categories_df['Watch Date & Time']).dt.to_period('M'),
-            categories_df['Categories']
-        )
+        if figures_dir is not None:
+            import matplotlib.pyplot as plt
+
+            category_by_date = context.monthly_category_counts[sorted(category_counts.index)]
+            category_by_date.index.name = 'Watch Date & Time'
+            category_by_date.columns.name = 'Categories'
         
-        plt.figure(figsize=(15, 8))
-        category_by_date.plot(kind='area', stacked=True)
-        plt.title('Evolution of Content Categories Over Time')
-        plt.xlabel('Date')
-        plt.ylabel('Number of Videos')
-        plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-        plt.tight_layout()
-        plt.savefig(figures_dir / 'category_evolution.png')
-        plt.close()
+            plt.figure(figsize=(15, 8))
+            category_by_date.plot(kind='area', stacked=True)
+            plt.title('Evolution of Content Categories Over Time')
+            plt.xlabel('Date')
+            plt.ylabel('Number of Videos')
+            plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+            plt.tight_layout()
+            plt.savefig(figures_dir / 'category_evolution.png')
+            plt.close()
 
         # Save category statistics
         category_stats = pd.DataFrame({
             'category': category_counts.index,
             'count': category_counts.values,
-            'percentage': (category_counts.values / len(df) * 100)
+            'percentage': (category_counts.values / len(context) * 100)
         })
         category_stats.to_csv(stats_dir / 'category_stats.csv', index=False)
 
-    def _analyze_channels(self, df, stats_dir, figures_dir):
+    def _analyze_channels(self, context, stats_dir, figures_dir):
         """Analyze channel patterns."""
         # Channel statistics
-        channel_stats = df.groupby('Channel Name').agg({
-            'Video Title': 'count'
-        }).sort_values('Video Title', ascending=False)
+        channel_stats = context.channel_counts.rename('Video Title').to_frame()
+        channel_stats.index.name = 'Channel Name'
 
         # Top channels visualization
-        plt.figure(figsize=(15, 8))
-        top_20_channels = channel_stats.head(20)
-        sns.barplot(x=top_20_channels.index, y='Video Title', data=top_20_channels)
-        plt.xticks(rotation=45, ha='right')
-        plt.title('Top 20 Most Watched Channels')
-        plt.xlabel('Channel Name')
-        plt.ylabel('Number of Videos Watched')
-        plt.tight_layout()
-        plt.savefig(figures_dir / 'top_channels.png')
-        plt.close()
+        if figures_dir is not None:
+            import matplotlib.pyplot as plt
+            import seaborn as sns
+
+            plt.figure(figsize=(15, 8))
+            top_20_channels = channel_stats.head(20)
+            top_20_channels.index = top_20_channels.index.astype(str)
+            sns.barplot(x=top_20_channels.index, y='Video Title', data=top_20_channels)
+            plt.xticks(rotation=45, ha='right')
+            plt.title('Top 20 Most Watched Channels')
+            plt.xlabel('Channel Name')
+            plt.ylabel('Number of Videos Watched')
+            plt.tight_layout()
+            plt.savefig(figures_dir / 'top_channels.png')
+            plt.close()
 
         # Save channel statistics
         channel_stats.to_csv(stats_dir / 'channel_stats.csv')
 
-    def _analyze_trends(self, df, stats_dir, figures_dir):
+    def _analyze_trends(self, context, stats_dir, figures_dir):
         """Analyze viewing trends."""
-        # Calculate moving averages
-        daily_views = df.groupby(pd.to_datetime(df['Watch Date & Time']).dt.date).size()
-        ma_7 = daily_views.rolling(window=7).mean()
-        ma_30 = daily_views.rolling(window=30).mean()
+        # Calculate moving averages over calendar days, including days without views
+        daily_series = context.daily_series
+        daily_views = daily_series.counts
+        moving_averages = daily_series.moving_averages(TREND_WINDOWS)
 
         # Plot trend lines
-        plt.figure(figsize=(15, 8))
-        plt.plot(daily_views.index, daily_views, alpha=0.5, label='Daily Views')
-        plt.plot(ma_7.index, ma_7, label='7-day Moving Average')
-        plt.plot(ma_30.index, ma_30, label='30-day Moving Average')
-        plt.title('Viewing Trends Over Time')
-        plt.xlabel('Date')
-        plt.ylabel('Number of Videos')
-        plt.legend()
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig(figures_dir / 'viewing_trends.png')
-        plt.close()
+        if figures_dir is not None:
+            import matplotlib.pyplot as plt
+
+            plt.figure(figsize=(15, 8))
+            plt.plot(daily_views.index, daily_views, alpha=0.5, label='Daily Views')
+            for window in (7, 30):
+                ma = moving_averages[f'ma_{window}']
+                plt.plot(ma.index, ma, label=f'{window}-day Moving Average')
+            plt.title('Viewing Trends Over Time')
+            plt.xlabel('Date')
+            plt.ylabel('Number of Videos')
+            plt.legend()
+            plt.grid(True)
+            plt.tight_layout()
+            plt.savefig(figures_dir / 'viewing_trends.png')
+            plt.close()
 
         # Save trend statistics
         trend_stats = pd.DataFrame({
-            'date': daily_views.index,
+            'date': daily_views.index.date,
             'daily_views': daily_views.values,
-            'ma_7': ma_7.values,
-            'ma_30': ma_30.values
+            **{column: values.values for column, values in moving_averages.items()}
         })
         trend_stats.to_csv(stats_dir / 'trend_stats.csv', index=False)
 
+    def _analyze_sessions(self, context, stats_dir, figures_dir):
+        """Analyze viewing sessions: runs of views at most ``session_gap`` apart."""
+        sessions = build_sessions(context, self.session_gap)
+        summary = session_summary(sessions, self.session_gap)
+
+        # Sessions by start hour; histories without watch times start at midnight
+        if figures_dir is not None and summary['has_time_of_day']:
+            import matplotlib.pyplot as plt
+
+            by_hour = pd.Series(summary['sessions_by_start_hour']).reindex(range(24), fill_value=0)
+            plt.figure(figsize=(15, 8))
+            plt.bar(by_hour.index, by_hour.values)
+            plt.xticks(range(24))
+            plt.title('Viewing Sessions by Start Hour')
+            plt.xlabel('Hour of Day')
+            plt.ylabel('Number of Sessions')
+            plt.tight_layout()
+            plt.savefig(figures_dir / 'session_start_hours.png')
+            plt.close()
+
+        # Save session statistics
+        sessions.to_csv(stats_dir / 'sessions.csv', index=False)
+        with open(stats_dir / 'session_stats.json', 'w') as f:
+            json.dump(summary, f, indent=4)
+
 def main():
+    parser = argparse.ArgumentParser(description='Write the content analysis stats and figures.')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='aggregate the history in chunks of this many rows '
+                             'instead of loading it whole')
+    add_session_arguments(parser)
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
     project_root = Path(__file__).parent.parent.parent
     data_file = project_root / 'data' / 'processed' / 'youtube_watch_history.csv'
     
-    df = pd.read_csv(data_file)
-    analyzer = ContentAnalyzer()
-    analyzer.generate_detailed_analysis(df)
+    cache_path = project_root / 'data' / 'cache' / 'categories.sqlite'
+    
+    profiler = profiler_from_args(args)
+    analyzer = ContentAnalyzer(cache_path=cache_path, profiler=profiler,
+                               session_gap=session_gap_from_args(args))
+    with profiler.stage('load_history') as stage:
+        if args.chunksize:
+            data = AnalysisContext.from_chunks(iter_history_chunks(data_file, args.chunksize),
+                                               analyzer=analyzer)
+        else:
+            data = load_history(data_file)
+        stage['rows'] = len(data)
+    analyzer.generate_detailed_analysis(data)
+    if args.run_report:
+        profiler.write_report(args.run_report)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
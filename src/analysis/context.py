@@ -0,0 +1,328 @@
+import calendar
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from .category_cache import unpack_categories
+from .timeseries import DailySeries
+
+
+def _name_weekdays(counts):
+    """Relabel counts by weekday code (Monday = 0) with day names, sorted by name."""
+    counts.index = pd.Index(np.array(calendar.day_name)[counts.index], name='Weekday')
+    return counts.sort_index()
+
+
+def _as_dates(counts):
+    """Relabel counts by day with ``datetime.date`` objects, as ``daily_counts`` has."""
+    counts.index = pd.Index(counts.index.date, name='Watch Date & Time')
+    return counts
+
+
+def _add_counts(total, part, sort=True):
+    """Add two count Series (or frames) aligned on their index."""
+    levels = list(range(total.index.nlevels))
+    return pd.concat([total, part]).groupby(level=levels, sort=sort, observed=True).sum()
+
+
+class AnalysisContext:
+    """Shared, single-load view of a watch history.
+
+    Timestamps are parsed once and every derived frame (daily counts, month
+    periods, year × month pivots, the category matrix, channel counts, ...)
+    is computed on first access and memoised, so a full report computes
+    each aggregate exactly once however many figures and stats use it.
+
+    Per-video columns are kept compact: year, month and weekday are small
+    integers and categories are one bitmask per video; names and boolean
+    matrices only appear in the aggregates.
+    """
+
+    def __init__(self, df, analyzer=None):
+        self.df = df
+        self.analyzer = analyzer
+
+    def __len__(self):
+        return self._length if self.df is None else len(self.df)
+
+    def detached(self, names):
+        """Return a picklable copy holding only the named aggregates.
+
+        The aggregates are computed first if needed. The copy has no
+        DataFrame and no analyzer, so it is cheap to send to worker
+        processes that only render figures from precomputed data.
+        """
+        clone = AnalysisContext(None)
+        clone._length = len(self)
+        for name in names:
+            clone.__dict__[name] = getattr(self, name)
+        return clone
+
+    # Aggregates that can be computed per chunk and folded together; every
+    # other aggregate of a chunked context is derived from these.
+    MERGEABLE = {
+        'daily_counts': _add_counts,
+        'monthly_counts': _add_counts,
+        'yearly_counts': _add_counts,
+        'month_of_year_counts': _add_counts,
+        'weekday_counts': _add_counts,
+        'year_month_sizes': _add_counts,
+        'channel_totals': lambda total, part: _add_counts(total, part, sort=False),
+        'daily_channel_counts': _add_counts,
+        'category_totals': lambda total, part: total + part,
+        'category_cooccurrence': lambda total, part: total + part,
+        'monthly_category_counts': _add_counts,
+        'day_channel_category_counts': _add_counts,
+    }
+
+    @classmethod
+    def from_chunks(cls, chunks, analyzer=None):
+        """Fold the history, read as an iterable of DataFrames, into a context.
+
+        Only one chunk is held in memory at a time. The result has no
+        DataFrame; it holds the ``MERGEABLE`` aggregates, folded so that
+        they equal those of a context built on the whole history, and the
+        aggregates derived from them (``year_month_counts``,
+        ``channel_counts``, ``top_channels``, ``category_counts``). Row-level
+        data such as ``timestamps`` or ``category_matrix`` is not available.
+        """
+        names = [name for name in cls.MERGEABLE
+                 if analyzer is not None or 'category' not in name]
+        totals = {}
+        length = 0
+        for chunk in chunks:
+            part = cls(chunk, analyzer=analyzer)
+            length += len(part)
+            for name in names:
+                value = getattr(part, name)
+                totals[name] = cls.MERGEABLE[name](totals[name], value) if name in totals else value
+
+        context = cls(None, analyzer=analyzer)
+        context._length = length
+        context.__dict__.update(totals)
+        return context
+
+    @classmethod
+    def from_cube(cls, cube, analyzer=None):
+        """Build a context whose aggregates are roll-ups of a ``RollupCube``.
+
+        Like ``from_chunks`` the result has no DataFrame. Each ``MERGEABLE``
+        aggregate is a weighted ``groupby`` over the cube's rows, equal to
+        the one computed from the whole history, and the derived aggregates
+        follow from them as usual.
+        """
+        frame = cube.frame
+        counts = frame['count']
+        dates = frame['Date']
+        periods = dates.dt.to_period('M').rename('Watch Date & Time')
+
+        def total(*keys):
+            return counts.groupby(list(keys), observed=True).sum().rename(None)
+
+        aggregates = {
+            'daily_counts': _as_dates(total(dates)),
+            'monthly_counts': total(periods),
+            'yearly_counts': total(frame['Year']),
+            'month_of_year_counts': total(frame['Month']),
+            'weekday_counts': _name_weekdays(total(frame['Weekday'])),
+            'year_month_sizes': total(frame['Year'], frame['Month']),
+            'channel_totals': total(frame['Channel Name']).rename('count'),
+            'daily_channel_counts': total(dates, frame['Channel Name']),
+        }
+        if analyzer is not None:
+            columns = pd.Index(cube.category_columns)
+            matrix = cube.category_matrix.astype(np.int64)
+            weighted = cube.weighted_category_matrix
+            aggregates.update({
+                'category_totals': pd.Series(weighted.sum(axis=0), index=columns),
+                'category_cooccurrence': pd.DataFrame(weighted.T @ matrix,
+                                                      index=columns, columns=columns),
+                'monthly_category_counts': pd.DataFrame(weighted, columns=columns)
+                                             .groupby(periods).sum(),
+            })
+
+        context = cls(None, analyzer=analyzer)
+        context._length = cube.total
+        context.__dict__.update(aggregates)
+        return context
+
+    # Time columns
+
+    @cached_property
+    def timestamps(self):
+        timestamps = self.df['Watch Date & Time']
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps)
+        return timestamps
+
+    @cached_property
+    def dates(self):
+        return self.timestamps.dt.date
+
+    @cached_property
+    def years(self):
+        return self.timestamps.dt.year.astype(np.int16).rename('Year')
+
+    @cached_property
+    def months(self):
+        """Month of year (1-12)."""
+        return self.timestamps.dt.month.astype(np.int8).rename('Month')
+
+    @cached_property
+    def weekdays(self):
+        """Day of week, Monday = 0."""
+        return self.timestamps.dt.dayofweek.astype(np.int8).rename('Weekday')
+
+    @cached_property
+    def periods(self):
+        """Calendar month of each view as a ``Period('M')``."""
+        return self.timestamps.dt.to_period('M')
+
+    # Time aggregates
+
+    @cached_property
+    def daily_counts(self):
+        return self.df.groupby(self.dates).size()
+
+    @cached_property
+    def daily_series(self):
+        """``daily_counts`` on a dense calendar, for windows and range totals."""
+        return DailySeries(self.daily_counts)
+
+    @cached_property
+    def monthly_counts(self):
+        return self.df.groupby(self.periods).size()
+
+    @cached_property
+    def yearly_counts(self):
+        return self.df.groupby(self.years).size()
+
+    @cached_property
+    def month_of_year_counts(self):
+        return self.df.groupby(self.months).size()
+
+    @cached_property
+    def weekday_counts(self):
+        """Views per day name, in alphabetical order of the names."""
+        return _name_weekdays(self.df.groupby(self.weekdays).size())
+
+    @cached_property
+    def year_month_sizes(self):
+        """View counts by (year, month of year)."""
+        return self.df.groupby([self.years, self.months]).size()
+
+    @cached_property
+    def year_month_counts(self):
+        """Year × month-of-year pivot of view counts."""
+        return self.year_month_sizes.unstack()
+
+    # Channels
+
+    @cached_property
+    def channel_totals(self):
+        """Views per channel, in order of first appearance."""
+        counts = self.df['Channel Name'].value_counts(sort=False)
+        return counts[counts > 0]  # unobserved categories of a categorical column
+
+    @cached_property
+    def channel_counts(self):
+        """Views per channel, most watched first; ties keep first-appearance order."""
+        return self.channel_totals.sort_values(ascending=False, kind='stable')
+
+    @cached_property
+    def daily_channel_counts(self):
+        """Views per (day, channel) pair; coarser periods are rolled up from it."""
+        days = self.timestamps.dt.normalize().rename('Date')
+        return self.df.groupby([days, self.df['Channel Name']], observed=True).size()
+
+    def top_channels(self, freq='M', k=1):
+        """The ``k`` most watched channels of every period of ``freq``.
+
+        ``freq`` is a pandas period frequency such as 'W', 'M' or 'Y'.
+        Returns view counts indexed by (period, channel), periods in order
+        and channels most watched first; ties keep the first-appearance
+        order of ``channel_counts``. Computed in one pass over
+        ``daily_channel_counts``, without a Python loop over periods.
+        """
+        counts = self.daily_channel_counts
+        (days, channels), (day_codes, channel_codes) = counts.index.levels, counts.index.codes
+        # Map the distinct days and channels, then broadcast through the codes
+        periods = days.to_period(freq)[day_codes]
+        channel_order = pd.Index(self.channel_totals.index.astype(object))
+        channel_ranks = channel_order.get_indexer(channels.astype(object))[channel_codes]
+
+        totals = counts.groupby([periods, channel_ranks]).sum()
+        rank_level = totals.index.levels[1]
+        period_codes, rank_codes = totals.index.codes
+        # Sort by period, then count descending, then first appearance
+        order = np.lexsort((rank_level[rank_codes], -totals.to_numpy(), period_codes))
+        ranked = totals.iloc[order]
+        top = ranked[ranked.groupby(level=0).cumcount().to_numpy() < k]
+
+        index = pd.MultiIndex.from_arrays(
+            [top.index.get_level_values(0),
+             channel_order[top.index.get_level_values(1)].rename('Channel Name')],
+            names=['Period', 'Channel Name'])
+        return pd.Series(top.to_numpy(), index=index, name='count')
+
+    # Categories
+
+    @cached_property
+    def category_masks(self):
+        """Category bitmask per video from ``ContentAnalyzer.categorize_masks``."""
+        if self.analyzer is None:
+            raise ValueError("category data needs an AnalysisContext built with an analyzer")
+        return self.analyzer.categorize_masks(self.df)
+
+    @cached_property
+    def category_matrix(self):
+        """Boolean video × category matrix, unpacked from ``category_masks``."""
+        columns = self.analyzer.category_columns
+        matrix = unpack_categories(self.category_masks, len(columns))
+        return pd.DataFrame(matrix, index=self.df.index, columns=columns)
+
+    @cached_property
+    def exploded_categories(self):
+        """One row per (video, category) pair, in row then category order.
+
+        ``Row`` holds the position of the video in ``df``.
+        """
+        rows, columns = np.nonzero(self.category_matrix.to_numpy())
+        return pd.DataFrame({
+            'Row': rows,
+            'Category': self.category_matrix.columns.to_numpy()[columns]
+        })
+
+    @cached_property
+    def category_totals(self):
+        """Videos per category column, in column order."""
+        return self.category_matrix.sum()
+
+    @cached_property
+    def category_counts(self):
+        """Videos per category, most common first, empty categories dropped."""
+        counts = self.category_totals
+        return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+    @cached_property
+    def category_cooccurrence(self):
+        """Category × category matrix of videos in both categories.
+
+        The diagonal holds the size of each category.
+        """
+        matrix = self.category_matrix.to_numpy(dtype=np.int64)
+        columns = self.category_matrix.columns
+        return pd.DataFrame(matrix.T @ matrix, index=columns, columns=columns)
+
+    @cached_property
+    def monthly_category_counts(self):
+        """Videos per calendar month and category column."""
+        return self.category_matrix.groupby(self.periods).sum()
+
+    @cached_property
+    def day_channel_category_counts(self):
+        """Views per (day, channel, category bitmask), the rows of a ``RollupCube``."""
+        days = self.timestamps.dt.normalize().rename('Date')
+        return self.df.groupby([days, self.df['Channel Name'], self.category_masks],
+                               observed=True).size()
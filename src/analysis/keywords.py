@@ -0,0 +1,87 @@
+import heapq
+import re
+from collections import Counter
+
+import pandas as pd
+
+# Runs of Unicode letters/digits (Latin, Cyrillic, ...), optionally joined by
+# an apostrophe or hyphen; everything else is treated as a separator.
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:['’-][^\W_]+)*")
+MIN_KEYWORD_LENGTH = 4
+
+
+def tokenize_titles(titles, min_length=MIN_KEYWORD_LENGTH):
+    """Split titles into lowercase keyword tokens, one row per token.
+
+    Punctuation, emoji and hashtag signs are stripped, purely numeric tokens
+    and tokens shorter than ``min_length`` are dropped.
+    """
+    tokens = pd.Series(titles, dtype=object).str.lower().str.findall(TOKEN_PATTERN).explode()
+    tokens = tokens.dropna()
+    return tokens[(tokens.str.len() >= min_length) & ~tokens.str.isdigit()]
+
+
+def count_keywords(titles, min_length=MIN_KEYWORD_LENGTH):
+    """Count keyword tokens across titles, in order of first appearance."""
+    return Counter(tokenize_titles(titles, min_length).value_counts(sort=False).to_dict())
+
+
+def top_keywords(counts, k):
+    """Return the ``k`` most frequent ``(keyword, count)`` pairs."""
+    if isinstance(counts, Counter):
+        return counts.most_common(k)
+    return heapq.nlargest(k, counts.items(), key=lambda item: item[1])
+
+
+class SpaceSavingCounter:
+    """Approximate top-k counter with memory bounded by ``capacity``.
+
+    Implements the Space-Saving algorithm: at most ``capacity`` keywords are
+    tracked, and a new keyword replaces the least frequent one, inheriting
+    its count. Counts are over-estimated by at most ``errors[keyword]``, and
+    any keyword whose true frequency exceeds ``total / capacity`` is kept.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        self._heap = []
+
+    def _push(self, keyword):
+        heapq.heappush(self._heap, (self.counts[keyword], keyword))
+
+    def _pop_min(self):
+        # Skip heap entries made stale by later increments
+        while True:
+            count, keyword = heapq.heappop(self._heap)
+            if self.counts.get(keyword) == count:
+                return keyword, count
+
+    def add(self, keyword, count=1):
+        self.total += count
+        if keyword in self.counts:
+            self.counts[keyword] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[keyword] = count
+            self.errors[keyword] = 0
+        else:
+            evicted, floor = self._pop_min()
+            del self.counts[evicted], self.errors[evicted]
+            self.counts[keyword] = floor + count
+            self.errors[keyword] = floor
+        self._push(keyword)
+
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, keyword) for keyword, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def update(self, titles, min_length=MIN_KEYWORD_LENGTH):
+        """Count the keywords of a batch of titles."""
+        for keyword, count in count_keywords(titles, min_length).items():
+            self.add(keyword, count)
+
+    def most_common(self, k=None):
+        k = len(self.counts) if k is None else k
+        return heapq.nlargest(k, self.counts.items(), key=lambda item: item[1])
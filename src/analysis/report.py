@@ -0,0 +1,334 @@
+import argparse
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from pathlib import Path
+
+from . import (content_analyzer, rollup_cube as rollup_cube_module,
+               sessions as sessions_module, timeseries, visualizer as visualizer_module)
+from .build_cache import BuildCache, file_digest, step_key
+from .content_analyzer import ContentAnalyzer
+from .context import AnalysisContext
+from .rollup_cube import AGGREGATE_SOURCES, CATEGORY_SOURCES, cube_for_history
+from .sessions import SESSION_GAP, add_session_arguments, session_gap_from_args
+from .visualizer import YouTubeHistoryVisualizer
+from ..processing.data_processor import load_history
+
+# Steps that render a figure, with the aggregates they read. Content
+# analysis steps run first: the visualizer overwrites two of their figures
+# and reads the category stats they write.
+ANALYSIS_STEPS = {
+    '_analyze_time_patterns': ['year_month_counts', 'yearly_counts',
+                               'month_of_year_counts', 'weekday_counts'],
+    '_analyze_categories': ['category_counts', 'monthly_category_counts'],
+    '_analyze_channels': ['channel_counts'],
+    '_analyze_trends': ['daily_series'],
+}
+FIGURE_STEPS = {
+    'plot_daily_views': ['daily_series'],
+    'plot_top_channels': ['channel_counts'],
+    'plot_weekly_patterns': ['weekday_counts'],
+    'plot_monthly_trends': ['monthly_counts'],
+    'plot_category_distribution': [],
+    'create_monthly_heatmap': ['year_month_counts'],
+    'analyze_category_correlations': ['category_cooccurrence'],
+    'analyze_seasonal_patterns': ['year_month_counts'],
+}
+# Stats are cheap to write; they run in the main process between the two
+# figure phases.
+STATS_STEPS = ['generate_basic_stats', 'generate_channel_stats']
+# Steps that need every view rather than aggregates, with the history
+# columns they read. They run in the main process on the loaded history,
+# which is only loaded if one of them is stale or the cube is rebuilt.
+HISTORY_STEPS = {
+    '_analyze_sessions': ['timestamps', 'category_masks'],
+}
+
+# Modules every step's output depends on: the module defining it and the
+# shared aggregates, which are rolled up from the cube. Steps add the
+# modules their aggregates are built with, such as the cube's
+# CATEGORY_SOURCES for the category masks.
+ANALYSIS_SOURCES = [content_analyzer, rollup_cube_module, *AGGREGATE_SOURCES]
+FIGURE_SOURCES = [visualizer_module, rollup_cube_module, *AGGREGATE_SOURCES]
+
+# Source modules of each step, and the files it reads and writes, relative
+# to results/, in run order. When two steps write the same file the later
+# one owns it: only owned files are checked when deciding whether a step
+# is up to date.
+STEP_FILES = {
+    '_analyze_time_patterns': (ANALYSIS_SOURCES, [],
+                               ['figures/monthly_heatmap.png', 'stats/time_patterns.csv']),
+    '_analyze_categories': (ANALYSIS_SOURCES + CATEGORY_SOURCES, [],
+                            ['figures/category_evolution.png', 'stats/category_stats.csv']),
+    '_analyze_channels': (ANALYSIS_SOURCES, [],
+                          ['figures/top_channels.png', 'stats/channel_stats.csv']),
+    '_analyze_trends': (ANALYSIS_SOURCES + [timeseries], [],
+                        ['figures/viewing_trends.png', 'stats/trend_stats.csv']),
+    '_analyze_sessions': (ANALYSIS_SOURCES + CATEGORY_SOURCES + [sessions_module], [],
+                          ['figures/session_start_hours.png', 'stats/sessions.csv',
+                           'stats/session_stats.json']),
+    'generate_basic_stats': (FIGURE_SOURCES, [], ['stats/basic_stats.json']),
+    'generate_channel_stats': (FIGURE_SOURCES, [], ['stats/channel_stats.json']),
+    'plot_daily_views': (FIGURE_SOURCES + [timeseries], [], ['figures/daily_views.png']),
+    'plot_top_channels': (FIGURE_SOURCES, [], ['figures/top_channels.png']),
+    'plot_weekly_patterns': (FIGURE_SOURCES, [], ['figures/weekly_patterns.png']),
+    'plot_monthly_trends': (FIGURE_SOURCES, [], ['figures/monthly_trends.png']),
+    'plot_category_distribution': (FIGURE_SOURCES, ['stats/category_stats.csv'],
+                                   ['figures/category_distribution.png']),
+    'create_monthly_heatmap': (FIGURE_SOURCES, [], ['figures/monthly_heatmap.png']),
+    'analyze_category_correlations': (FIGURE_SOURCES + CATEGORY_SOURCES,
+                                      ['stats/category_stats.csv'],
+                                      ['figures/category_correlations.png']),
+    'analyze_seasonal_patterns': (FIGURE_SOURCES, [], ['figures/seasonal_patterns.png']),
+}
+OUTPUT_OWNERS = {output: step for step, (_, _, outputs) in STEP_FILES.items()
+                 for output in outputs}
+# Every step reads its aggregates from this cube, see ``rollup_cube.py``
+CUBE_FILE = 'stats/rollup_cube.parquet'
+
+# Per-process state set up by the pool initializers
+_worker = {}
+
+
+def _timed(label, func, *args):
+    """Run one report step, returning its timing and any failure."""
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    error = None
+    try:
+        func(*args)
+    except Exception:
+        error = traceback.format_exc()
+        import matplotlib.pyplot as plt
+        plt.close('all')
+    return {
+        'step': label,
+        'seconds': time.perf_counter() - start,
+        'cpu_seconds': time.process_time() - cpu_start,
+        'error': error,
+        'cached': False,
+    }
+
+def _cached(label):
+    return {'step': label, 'seconds': 0.0, 'cpu_seconds': 0.0, 'error': None, 'cached': True}
+
+
+def _init_analysis_worker(context, stats_dir, figures_dir):
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+    _worker['analyzer'] = ContentAnalyzer()
+    _worker['context'] = context
+    _worker['dirs'] = (stats_dir, figures_dir)
+
+
+def _run_analysis_step(name):
+    method = getattr(_worker['analyzer'], name)
+    return _timed(name, method, _worker['context'], *_worker['dirs'])
+
+
+def _init_figure_worker(context):
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+    _worker['visualizer'] = YouTubeHistoryVisualizer(context=context)
+
+
+def _run_figure_step(name):
+    return _timed(name, getattr(_worker['visualizer'], name))
+
+
+def _run_phase(steps, initializer, initargs, run_step, workers):
+    """Run independent steps serially or on a process pool, keeping order."""
+    if workers <= 1:
+        initializer(*initargs)
+        return [run_step(name) for name in steps]
+    with ProcessPoolExecutor(max_workers=min(workers, len(steps)),
+                             initializer=initializer, initargs=initargs) as executor:
+        return list(executor.map(run_step, steps))
+
+
+def _owned_outputs(step, results_dir):
+    return [results_dir / output for output in STEP_FILES[step][2]
+            if OUTPUT_OWNERS[output] == step]
+
+def _step_key(step, data_digest, analyzer, results_dir):
+    """Fingerprint everything ``step`` depends on.
+
+    That is the input data, the source of the modules listed for the step in
+    ``STEP_FILES`` (the module defining it, the shared aggregates and the
+    modules those are built with), the files it reads, and, for steps that
+    use the category matrix, ``content_patterns``. Step parameters such as
+    ``top_n`` are part of the module source; the session gap is an input of
+    the steps that build sessions.
+    """
+    sources, reads, _ = STEP_FILES[step]
+    inputs = {
+        'step': step,
+        'data': data_digest,
+        'code': [file_digest(module.__file__) for module in dict.fromkeys(sources)],
+        'reads': {path: file_digest(results_dir / path) for path in reads},
+    }
+    if step in HISTORY_STEPS:
+        inputs['session_gap'] = str(analyzer.session_gap)
+    needs = {**ANALYSIS_STEPS, **HISTORY_STEPS, **FIGURE_STEPS}.get(step, [])
+    if any(name.startswith('category') for name in needs):
+        inputs['patterns'] = analyzer.patterns_fingerprint
+    return step_key(**inputs)
+
+
+def generate_report(data_file, cache_path=None, workers=1, build_cache_path=None, force=False,
+                    session_gap=SESSION_GAP):
+    """Run the content analysis and all visualizations on one shared context.
+
+    Every aggregate is rolled up once, in this process, from the rollup
+    cube saved in ``results/stats``; the history is only loaded to build
+    the cube when it is missing or out of date, or for the steps that need
+    every view (``HISTORY_STEPS``), such as sessions split on
+    ``session_gap``. With ``workers > 1`` the figures are then rendered in
+    parallel by a process pool, each worker receiving only the precomputed
+    aggregates. Returns one timing record per step; failing steps carry
+    their traceback under ``error`` instead of stopping the report.
+
+    With ``build_cache_path``, a step is skipped (and reported as
+    ``cached``) when none of its inputs changed since it last produced its
+    current outputs, see ``_step_key``. The history is only loaded if some
+    step has to run. ``force`` rebuilds everything and refreshes the cache.
+    """
+    analyzer = ContentAnalyzer(cache_path=cache_path, session_gap=session_gap)
+    build_cache = BuildCache(build_cache_path) if build_cache_path else None
+    data_digest = file_digest(data_file) if build_cache else None
+
+    results_dir = Path(__file__).parent.parent.parent / 'results'
+
+    @cache
+    def history_context():
+        return AnalysisContext(load_history(data_file), analyzer=analyzer)
+
+    @cache
+    def shared_context():
+        cube = cube_for_history(data_file, analyzer, results_dir / CUBE_FILE,
+                                load_context=history_context)
+        return AnalysisContext.from_cube(cube, analyzer=analyzer)
+
+    stats_dir = results_dir / 'stats'
+    figures_dir = results_dir / 'figures'
+    stats_dir.mkdir(parents=True, exist_ok=True)
+    figures_dir.mkdir(parents=True, exist_ok=True)
+
+    def aggregates(steps, needs):
+        names = sorted({name for step in steps for name in needs[step]})
+        return shared_context().detached(names) if workers > 1 else shared_context()
+
+    def run_stale(steps, run):
+        """Run the steps whose inputs or outputs changed, skip the others."""
+        if build_cache is None:
+            return run(steps)
+        keys = {step: _step_key(step, data_digest, analyzer, results_dir) for step in steps}
+        stale = [step for step in steps if force or not build_cache.is_fresh(
+            step, keys[step], _owned_outputs(step, results_dir))]
+        ran = {timing['step']: timing for timing in run(stale)} if stale else {}
+        for step, timing in ran.items():
+            if timing['error']:
+                build_cache.forget(step)
+            else:
+                build_cache.record(step, keys[step], _owned_outputs(step, results_dir))
+        return [ran.get(step) or _cached(step) for step in steps]
+
+    timings = run_stale(list(ANALYSIS_STEPS), lambda steps: _run_phase(
+        steps, _init_analysis_worker,
+        (aggregates(steps, ANALYSIS_STEPS), stats_dir, figures_dir),
+        _run_analysis_step, workers))
+
+    # History steps stay in this process, next to the loaded history
+    def run_history(steps):
+        return [_timed(step, getattr(analyzer, step), history_context(), stats_dir, figures_dir)
+                for step in steps]
+    timings += run_stale(list(HISTORY_STEPS), run_history)
+
+    # Stats stay in this process
+    def run_stats(steps):
+        visualizer = YouTubeHistoryVisualizer(context=shared_context())
+        return [_timed(step, getattr(visualizer, step)) for step in steps]
+    timings += run_stale(STATS_STEPS, run_stats)
+
+    timings += run_stale(list(FIGURE_STEPS), lambda steps: _run_phase(
+        steps, _init_figure_worker, (aggregates(steps, FIGURE_STEPS),),
+        _run_figure_step, workers))
+
+    if build_cache is not None:
+        build_cache.save()
+    return timings
+
+def generate_stats(data_file, cache_path=None, profiler=None, session_gap=SESSION_GAP):
+    """Write every stats file of the report without drawing any figure.
+
+    matplotlib and seaborn are never imported, which keeps scheduled
+    stats-only runs fast to start. The stats are rolled up from the saved
+    rollup cube, as in ``generate_report``; the session stats are built
+    from the loaded history. Stages are recorded on ``profiler``.
+    """
+    analyzer = ContentAnalyzer(cache_path=cache_path, profiler=profiler, session_gap=session_gap)
+    profiler = analyzer.profiler
+    results_dir = Path(__file__).parent.parent.parent / 'results'
+
+    @cache
+    def history_context():
+        with profiler.stage('load_history') as stage:
+            context = AnalysisContext(load_history(data_file), analyzer=analyzer)
+            stage['rows'] = len(context)
+        return context
+
+    with profiler.stage('rollup_cube') as stage:
+        cube = cube_for_history(data_file, analyzer, results_dir / CUBE_FILE,
+                                load_context=history_context)
+        stage['rows'] = len(cube)
+    with profiler.stage('rollup_aggregates', rows=len(cube)):
+        context = AnalysisContext.from_cube(cube, analyzer=analyzer)
+
+    analyzer.generate_detailed_analysis(context, figures=False)
+    visualizer = YouTubeHistoryVisualizer(context=context)
+    with profiler.stage('visualizer.generate_basic_stats', rows=len(context)):
+        stats = visualizer.generate_basic_stats()
+    with profiler.stage('visualizer.generate_channel_stats', rows=len(context)):
+        visualizer.generate_channel_stats()
+
+    history = history_context()
+    with profiler.stage('categorize', rows=len(history)):
+        history.category_masks
+    with profiler.stage('sessions', rows=len(history)):
+        analyzer._analyze_sessions(history, results_dir / 'stats', None)
+    return stats
+
+def add_arguments(parser):
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='number of processes used to render figures')
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild every output even if its inputs are unchanged')
+    add_session_arguments(parser)
+
+def run(args):
+    project_root = Path(__file__).parent.parent.parent
+    data_file = project_root / 'data' / 'processed' / 'youtube_watch_history.csv'
+    cache_path = project_root / 'data' / 'cache' / 'categories.sqlite'
+    build_cache_path = project_root / 'data' / 'cache' / 'report_outputs.json'
+
+    timings = generate_report(data_file, cache_path=cache_path, workers=args.workers,
+                              build_cache_path=build_cache_path, force=args.force,
+                              session_gap=session_gap_from_args(args))
+    for timing in timings:
+        status = 'FAILED' if timing['error'] else 'cached' if timing['cached'] else 'ok'
+        print(f"{timing['step']:<32} {timing['seconds']:7.2f}s  {status}")
+    cached = sum(timing['cached'] for timing in timings)
+    print(f"{cached} of {len(timings)} steps were up to date")
+    for timing in timings:
+        if timing['error']:
+            print(f"\n{timing['step']} failed:\n{timing['error']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate all stats and figures.')
+    add_arguments(parser)
+    run(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import json
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import category_cache, content_analyzer, context as context_module
+from .build_cache import file_digest
+from .category_cache import unpack_categories
+from .context import AnalysisContext
+from ..processing.data_processor import load_history
+
+# Dimensions ``rollup`` accepts; 'Category' expands each category set into
+# its member categories, the others are columns of the cube.
+DIMENSIONS = ['Date', 'Year', 'Month', 'Weekday', 'Channel Name', 'Category']
+METADATA_KEY = b'rollup_cube'
+# Modules the cube is built with besides this one: the aggregates, and the
+# category masks, matched by content_analyzer and packed by category_cache.
+# A saved cube is rebuilt when any of them changes; report steps key on
+# the same lists.
+AGGREGATE_SOURCES = [context_module]
+CATEGORY_SOURCES = [content_analyzer, category_cache]
+
+
+class RollupCube:
+    """Materialised view counts by day × channel × category set.
+
+    One row per distinct (day, channel, category bitmask) with the number
+    of views, plus the year, month and weekday (Monday = 0) of the day as
+    small integer columns. Channels are a categorical in order of first
+    appearance in the history. Any slice of the history along these
+    dimensions is a ``groupby`` over the cube, which has far fewer rows
+    than the history, and ``AnalysisContext.from_cube`` derives every
+    aggregate of the report from it.
+    """
+
+    def __init__(self, frame, category_columns, metadata=None):
+        self.frame = frame
+        self.category_columns = list(category_columns)
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_context(cls, context):
+        """Build the cube from a context with an analyzer, loaded or chunked."""
+        counts = context.day_channel_category_counts
+        dates = pd.DatetimeIndex(counts.index.get_level_values(0))
+        channel_order = pd.Index(context.channel_totals.index.astype(object))
+        frame = pd.DataFrame({
+            'Date': dates,
+            'Year': dates.year.astype(np.int16),
+            'Month': dates.month.astype(np.int8),
+            'Weekday': dates.dayofweek.astype(np.int8),
+            'Channel Name': pd.Categorical(counts.index.get_level_values(1).astype(object),
+                                           categories=channel_order),
+            'Category Mask': counts.index.get_level_values(2).to_numpy(),
+            'count': counts.to_numpy(dtype=np.int64),
+        })
+        frame = frame.sort_values(['Date', 'Channel Name', 'Category Mask'], ignore_index=True)
+        return cls(frame, context.analyzer.category_columns)
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def total(self):
+        """Number of views in the history."""
+        return int(self.frame['count'].sum())
+
+    @cached_property
+    def category_matrix(self):
+        """Boolean cube row × category matrix, unpacked from the bitmasks."""
+        return unpack_categories(self.frame['Category Mask'].to_numpy(),
+                                 len(self.category_columns))
+
+    @cached_property
+    def weighted_category_matrix(self):
+        """Views per cube row and category: ``category_matrix`` times ``count``."""
+        return self.category_matrix * self.frame['count'].to_numpy()[:, None]
+
+    def rollup(self, *dimensions):
+        """Total views for every combination of ``dimensions``.
+
+        For example ``rollup('Category', 'Weekday')`` or
+        ``rollup('Channel Name', 'Year')``. With 'Category' a view counts
+        once for each of its categories, like ``category_counts``.
+        """
+        unknown = [dimension for dimension in dimensions if dimension not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimensions {unknown}; choose from {DIMENSIONS}")
+        if not dimensions:
+            return self.total
+
+        if 'Category' not in dimensions:
+            return self.frame.groupby(list(dimensions), observed=True)['count'].sum()
+
+        # Sum the count-weighted category matrix per group instead of
+        # expanding every cube row into one row per category
+        others = [dimension for dimension in dimensions if dimension != 'Category']
+        weighted = pd.DataFrame(self.weighted_category_matrix)
+        if others:
+            grouped = weighted.groupby([self.frame[name] for name in others], observed=True).sum()
+            group_index = grouped.index
+        else:
+            grouped = weighted.sum().to_frame().T
+            group_index = None
+        rows, columns = np.nonzero(grouped.to_numpy())
+
+        levels = {'Category': pd.Categorical.from_codes(columns, self.category_columns)}
+        for level, name in enumerate(others):
+            levels[name] = group_index.get_level_values(level)[rows]
+        index = pd.MultiIndex.from_arrays([levels[name] for name in dimensions],
+                                          names=list(dimensions))
+        if len(dimensions) == 1:
+            index = index.get_level_values(0)
+        totals = pd.Series(grouped.to_numpy()[rows, columns], index=index, name='count')
+        return totals.sort_index()
+
+    def save(self, path, **metadata):
+        """Write the cube as Parquet, with ``metadata`` and the category names."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(self.frame, preserve_index=False)
+        payload = json.dumps({'category_columns': self.category_columns, **metadata})
+        table = table.replace_schema_metadata({**table.schema.metadata,
+                                               METADATA_KEY: payload.encode('utf-8')})
+        pq.write_table(table, path)
+        self.metadata = metadata
+
+    @classmethod
+    def load(cls, path):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path)
+        metadata = json.loads(table.schema.metadata[METADATA_KEY])
+        category_columns = metadata.pop('category_columns')
+        return cls(table.to_pandas(), category_columns, metadata)
+
+
+def cube_for_history(data_file, analyzer, path, load_context=None):
+    """Load the cube of ``data_file`` from ``path``, or build and save it.
+
+    The saved cube records the digest of the history, the fingerprint of
+    the category patterns and the digest of the code that built it; if any
+    of them changed it is rebuilt from the history. ``load_context``
+    returns the loaded history as an ``AnalysisContext``, for callers that
+    need it anyway; by default it is loaded here.
+    """
+    path = Path(path)
+    metadata = {
+        'data': file_digest(data_file),
+        'patterns': analyzer.patterns_fingerprint,
+        'code': [file_digest(__file__)] + [file_digest(module.__file__)
+                                           for module in AGGREGATE_SOURCES + CATEGORY_SOURCES],
+    }
+    if path.exists():
+        cube = RollupCube.load(path)
+        if cube.metadata == metadata:
+            return cube
+
+    if load_context is None:
+        context = AnalysisContext(load_history(data_file), analyzer=analyzer)
+    else:
+        context = load_context()
+    cube = RollupCube.from_context(context)
+    cube.save(path, **metadata)
+    return cube
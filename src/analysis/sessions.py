@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+# Views further apart than this start a new session
+SESSION_GAP = pd.Timedelta(minutes=30)
+# Columns of a ``build_sessions`` frame, for histories without any view
+SESSION_DTYPES = {'start': 'datetime64[ns]', 'end': 'datetime64[ns]', 'minutes': float,
+                  'videos': np.int64, 'dominant_channel': object,
+                  'dominant_channel_share': float}
+
+
+def session_bounds(timestamps, gap=SESSION_GAP):
+    """Sort views by time and split them into sessions.
+
+    Returns the stable sort order of ``timestamps`` and, in that order, the
+    position of the first view of every session. A session ends when the
+    next view starts more than ``gap`` after the previous one.
+    """
+    values = np.asarray(timestamps, dtype='datetime64[ns]').astype(np.int64)
+    order = np.argsort(values, kind='stable')
+    gaps = np.diff(values[order]) > pd.Timedelta(gap).value
+    starts = np.flatnonzero(np.concatenate([[True], gaps])) if len(values) else np.array([], int)
+    return order, starts
+
+
+def _dominant(session_ids, codes, n_sessions):
+    """Most frequent code of each session; ties go to the one seen first."""
+    if not len(codes):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    n_codes = int(codes.max()) + 1 if len(codes) else 1
+    pairs, first_seen, counts = np.unique(session_ids * n_codes + codes,
+                                          return_index=True, return_counts=True)
+    pair_sessions = pairs // n_codes
+    order = np.lexsort((first_seen, -counts, pair_sessions))
+    is_top = np.concatenate([[True], np.diff(pair_sessions[order]) != 0])
+    top = order[is_top]
+
+    dominant = np.empty(n_sessions, dtype=np.int64)
+    dominant[pair_sessions[top]] = pairs[top] % n_codes
+    views = np.zeros(n_sessions, dtype=np.int64)
+    views[pair_sessions[top]] = counts[top]
+    return dominant, views
+
+
+def build_sessions(context, gap=SESSION_GAP):
+    """Reconstruct the viewing sessions of a loaded history.
+
+    Sorts the views once, marks session boundaries where consecutive views
+    are more than ``gap`` apart, and computes every per-session column
+    with array operations. Returns one row per session, in time order:
+    start and end (first and last view), length in minutes between them,
+    the number of videos, the dominant channel with its share of the
+    videos and, with an analyzer, the dominant category.
+    """
+    order, starts = session_bounds(context.timestamps, gap)
+    n_views, n_sessions = len(order), len(starts)
+    if not n_views:
+        dtypes = dict(SESSION_DTYPES)
+        if context.analyzer is not None:
+            dtypes['dominant_category'] = object
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in dtypes.items()})
+    timestamps = context.timestamps.to_numpy()[order]
+    ends = np.concatenate([starts[1:], [n_views]]) - 1
+    videos = np.diff(np.concatenate([starts, [n_views]]))
+    session_ids = np.repeat(np.arange(n_sessions), videos)
+
+    channel_codes, channels = pd.factorize(context.df['Channel Name'])
+    dominant_channel, channel_views = _dominant(session_ids, channel_codes[order], n_sessions)
+
+    sessions = pd.DataFrame({
+        'start': timestamps[starts],
+        'end': timestamps[ends],
+        'minutes': (timestamps[ends] - timestamps[starts]) / pd.Timedelta(minutes=1),
+        'videos': videos,
+        'dominant_channel': np.asarray(channels, dtype=object)[dominant_channel],
+        'dominant_channel_share': channel_views / videos,
+    })
+
+    if context.analyzer is not None:
+        columns = context.analyzer.category_columns
+        masks = context.category_masks.to_numpy()[order].astype(np.int64)
+        # Videos per session and category, one bit at a time to keep memory
+        # linear; argmax keeps the first column on ties
+        per_session = np.column_stack([np.add.reduceat((masks >> bit) & 1, starts)
+                                       for bit in range(len(columns))])
+        sessions['dominant_category'] = np.asarray(columns, dtype=object)[per_session.argmax(axis=1)]
+    return sessions
+
+
+def session_summary(sessions, gap=SESSION_GAP):
+    """Headline statistics of a ``build_sessions`` frame, JSON-serialisable."""
+    has_time = bool(len(sessions)) and bool(
+        (sessions['start'] != sessions['start'].dt.normalize()).any())
+    summary = {
+        'session_gap_minutes': pd.Timedelta(gap) / pd.Timedelta(minutes=1),
+        'has_time_of_day': has_time,
+        'sessions': len(sessions),
+    }
+    if not len(sessions):
+        return summary
+
+    days = sessions['start'].dt.normalize().nunique()
+    summary.update({
+        'sessions_per_active_day': len(sessions) / days,
+        'average_videos_per_session': float(sessions['videos'].mean()),
+        'median_videos_per_session': float(sessions['videos'].median()),
+        'average_minutes': float(sessions['minutes'].mean()),
+        'median_minutes': float(sessions['minutes'].median()),
+        'longest_session': {
+            'start': sessions['start'].iloc[sessions['minutes'].argmax()].isoformat(),
+            'minutes': float(sessions['minutes'].max()),
+        },
+        'single_video_share': float((sessions['videos'] == 1).mean()),
+        'sessions_by_start_hour': {
+            int(hour): int(count)
+            for hour, count in sessions['start'].dt.hour.value_counts().sort_index().items()
+        },
+    })
+    if 'dominant_category' in sessions:
+        summary['sessions_by_dominant_category'] = {
+            category: int(count)
+            for category, count in sessions['dominant_category'].value_counts().items()
+        }
+    return summary
+
+
+def add_session_arguments(parser):
+    parser.add_argument('--session-gap', type=float, default=SESSION_GAP / pd.Timedelta(minutes=1),
+                        metavar='MINUTES',
+                        help='idle time that ends a viewing session (default: %(default)g)')
+
+
+def session_gap_from_args(args):
+    """The session gap requested by ``add_session_arguments`` options."""
+    return pd.Timedelta(minutes=args.session_gap)
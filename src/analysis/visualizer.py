@@ -1,40 +1,101 @@
+import argparse
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
 import json
 from datetime import datetime
 import calendar
 import numpy as np
 
+from .content_analyzer import ContentAnalyzer
+from .context import AnalysisContext
+from ..processing.data_processor import (iter_history_chunks, load_history,
+                                         open_history_database)
+from ..profiling import add_profiling_arguments, profiler_from_args
+
 class YouTubeHistoryVisualizer:
-    def __init__(self, data_file):
-        self.df = pd.read_csv(data_file)
-        self.df['Watch Date & Time'] = pd.to_datetime(self.df['Watch Date & Time'])
+    def __init__(self, data_file=None, cache_path=None, context=None, chunksize=None):
+        """Load ``data_file``, or reuse the data of a shared ``context``.
+
+        With ``chunksize``, ``data_file`` is folded chunk by chunk into
+        aggregates (see ``AnalysisContext.from_chunks``) instead of being
+        loaded whole; ``df`` is then None.
+        """
+        if context is None:
+            self.analyzer = ContentAnalyzer(cache_path=cache_path)
+            if chunksize:
+                context = AnalysisContext.from_chunks(iter_history_chunks(data_file, chunksize),
+                                                      analyzer=self.analyzer)
+            else:
+                context = AnalysisContext(load_history(data_file), analyzer=self.analyzer)
+        else:
+            self.analyzer = context.analyzer or ContentAnalyzer(cache_path=cache_path)
+            context.analyzer = self.analyzer
+        self.context = context
+        self.df = context.df
         self.results_dir = Path(__file__).parent.parent.parent / 'results'
         self.figures_dir = self.results_dir / 'figures'
         self.stats_dir = self.results_dir / 'stats'
-        
-        # Set custom color palette and style
-        self.color_palette = sns.color_palette("husl", 15)  # Increased colors for more variety
-        self.bar_colors = sns.color_palette("Set3", 15)     # Softer colors for bars
-        
-        # Use a built-in style instead of seaborn
-        plt.style.use('bmh')  # Alternative: 'fivethirtyeight', 'ggplot', 'classic'
-        sns.set_theme()  # This will set seaborn defaults without requiring the style file
-        sns.set_palette(self.color_palette)
+
+    @classmethod
+    def from_database(cls, data_file, cache_path=None, **filters):
+        """Build a visualizer over only the views matching ``filters``.
+
+        The rows are read from the indexed SQLite store of ``data_file``
+        (see ``HistoryDatabase.query`` for the filters), so a report for
+        one channel or month never loads the whole history. Outputs go to
+        ``results/filtered/`` instead of ``results/``, together with the
+        filtered ``category_stats.csv`` the category plots read.
+        """
+        analyzer = ContentAnalyzer(cache_path=cache_path)
+        history_database = open_history_database(data_file)
+        try:
+            if filters.get('category') is not None:
+                history_database.categorize(analyzer)
+            df = history_database.query(**filters)
+        finally:
+            history_database.close()
+
+        visualizer = cls(context=AnalysisContext(df, analyzer=analyzer))
+        visualizer.results_dir = visualizer.results_dir / 'filtered'
+        visualizer.figures_dir = visualizer.results_dir / 'figures'
+        visualizer.stats_dir = visualizer.results_dir / 'stats'
+        visualizer.figures_dir.mkdir(parents=True, exist_ok=True)
+        visualizer.stats_dir.mkdir(parents=True, exist_ok=True)
+        if len(df):
+            analyzer._analyze_categories(visualizer.context, visualizer.stats_dir, None)
+        return visualizer
+
+    def _plotting(self):
+        """Import matplotlib and seaborn and apply the figure style.
+
+        Deferred to the first plot so that stats-only runs never pay for
+        importing the plotting libraries.
+        """
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        if not hasattr(self, 'color_palette'):
+            # Set custom color palette and style
+            self.color_palette = sns.color_palette("husl", 15)  # Increased colors for more variety
+            self.bar_colors = sns.color_palette("Set3", 15)     # Softer colors for bars
+            
+            # Use a built-in style instead of seaborn
+            plt.style.use('bmh')  # Alternative: 'fivethirtyeight', 'ggplot', 'classic'
+            sns.set_theme()  # This will set seaborn defaults without requiring the style file
+            sns.set_palette(self.color_palette)
+        return plt, sns
 
     def generate_basic_stats(self):
         """Generate basic statistics about the viewing history."""
         stats = {
-            'total_videos_watched': len(self.df),
-            'unique_channels': len(self.df['Channel Name'].unique()),
+            'total_videos_watched': len(self.context),
+            'unique_channels': len(self.context.channel_counts),
             'date_range': {
-                'start': self.df['Watch Date & Time'].min().strftime('%Y-%m-%d'),
-                'end': self.df['Watch Date & Time'].max().strftime('%Y-%m-%d')
+                'start': self.context.daily_counts.index.min().strftime('%Y-%m-%d'),
+                'end': self.context.daily_counts.index.max().strftime('%Y-%m-%d')
             },
-            'most_active_day': self.df.groupby(self.df['Watch Date & Time'].dt.date).size().idxmax().strftime('%Y-%m-%d'),
-            'average_videos_per_day': self.df.groupby(self.df['Watch Date & Time'].dt.date).size().mean()
+            'most_active_day': self.context.daily_counts.idxmax().strftime('%Y-%m-%d'),
+            'average_videos_per_day': self.context.daily_counts.mean()
         }
         
         # Save stats to JSON
@@ -45,13 +106,15 @@ class YouTubeHistoryVisualizer:
 
     def plot_daily_views(self):
         """Plot number of videos watched per day with rolling average."""
-        daily_views = self.df.groupby(self.df['Watch Date & Time'].dt.date).size()
+        plt, sns = self._plotting()
+        daily_series = self.context.daily_series
+        daily_views = daily_series.counts
         
         plt.figure(figsize=(15, 8))
         plt.plot(daily_views.index, daily_views, alpha=0.3, color=self.color_palette[0], label='Daily Views')
-        plt.plot(daily_views.index, daily_views.rolling(window=7).mean(), 
+        plt.plot(daily_views.index, daily_series.rolling_mean(7), 
                 color=self.color_palette[1], linewidth=2, label='7-day Moving Average')
-        plt.plot(daily_views.index, daily_views.rolling(window=30).mean(), 
+        plt.plot(daily_views.index, daily_series.rolling_mean(30), 
                 color=self.color_palette[2], linewidth=2, label='30-day Moving Average')
         
         plt.title('Daily Viewing Patterns (2021-2024)', fontsize=14, pad=20)
@@ -62,7 +125,7 @@ class YouTubeHistoryVisualizer:
         
         # Add annotations for key events
         max_day = daily_views.idxmax()
-        plt.annotate(f'Peak: {daily_views.max()} videos\n{max_day}',
+        plt.annotate(f'Peak: {daily_views.max()} videos\n{max_day:%Y-%m-%d}',
                     xy=(max_day, daily_views.max()),
                     xytext=(10, 10), textcoords='offset points',
                     bbox=dict(boxstyle='round,pad=0.5', fc='yellow', alpha=0.5),
@@ -74,7 +137,8 @@ class YouTubeHistoryVisualizer:
 
     def plot_top_channels(self, top_n=15):
         """Plot top N most watched channels with percentage."""
-        channel_counts = self.df['Channel Name'].value_counts()
+        plt, sns = self._plotting()
+        channel_counts = self.context.channel_counts
         top_channels = channel_counts.head(top_n)
         
         plt.figure(figsize=(15, 8))
@@ -88,7 +152,7 @@ class YouTubeHistoryVisualizer:
         plt.xticks(range(len(top_channels)), top_channels.index, rotation=45, ha='right')
         
         # Add percentage labels
-        total_videos = len(self.df)
+        total_videos = len(self.context)
         for i, v in enumerate(top_channels):
             percentage = (v / total_videos) * 100
             ax.text(i, v, f'{percentage:.1f}%', 
@@ -105,9 +169,8 @@ class YouTubeHistoryVisualizer:
 
     def plot_weekly_patterns(self):
         """Plot viewing patterns by day of week."""
-        self.df['Weekday'] = self.df['Watch Date & Time'].dt.day_name()
-        weekly_views = self.df['Weekday'].value_counts()
-        weekly_views = weekly_views.reindex(list(calendar.day_name))
+        plt, sns = self._plotting()
+        weekly_views = self.context.weekday_counts.reindex(list(calendar.day_name))
         
         plt.figure(figsize=(12, 6))
         bars = plt.bar(range(len(weekly_views)), weekly_views.values, 
@@ -132,7 +195,8 @@ class YouTubeHistoryVisualizer:
 
     def plot_monthly_trends(self):
         """Plot viewing trends by month."""
-        monthly_views = self.df.groupby(self.df['Watch Date & Time'].dt.to_period('M')).size()
+        plt, sns = self._plotting()
+        monthly_views = self.context.monthly_counts
         
         plt.figure(figsize=(15, 8))
         monthly_views.plot(kind='bar')
@@ -148,20 +212,21 @@ class YouTubeHistoryVisualizer:
     def generate_channel_stats(self):
         """Generate detailed statistics about channel viewing patterns."""
         channel_stats = {
-            'top_channels': self.df['Channel Name'].value_counts().head(20).to_dict(),
+            'top_channels': self.context.channel_counts.head(20).to_dict(),
             'monthly_top_channels': {}
         }
 
         # Get top channel for each month
-        for name, group in self.df.groupby(self.df['Watch Date & Time'].dt.to_period('M')):
-            top_channel = group['Channel Name'].value_counts().index[0]
-            channel_stats['monthly_top_channels'][str(name)] = top_channel
+        monthly_top = self.context.top_channels('M', k=1)
+        for period, channel in monthly_top.index:
+            channel_stats['monthly_top_channels'][str(period)] = channel
 
         with open(self.stats_dir / 'channel_stats.json', 'w') as f:
             json.dump(channel_stats, f, indent=4)
 
     def plot_category_distribution(self):
         """Plot category distribution with percentages."""
+        plt, sns = self._plotting()
         category_stats = pd.read_csv(self.stats_dir / 'category_stats.csv')
         
         plt.figure(figsize=(15, 8))
@@ -188,10 +253,8 @@ class YouTubeHistoryVisualizer:
 
     def create_monthly_heatmap(self):
         """Create monthly viewing heatmap."""
-        monthly_views = self.df.groupby([
-            self.df['Watch Date & Time'].dt.year,
-            self.df['Watch Date & Time'].dt.month
-        ]).size().unstack()
+        plt, sns = self._plotting()
+        monthly_views = self.context.year_month_counts
         
         plt.figure(figsize=(15, 8))
         sns.heatmap(monthly_views, cmap='YlOrRd', annot=True, fmt='g',
@@ -210,25 +273,19 @@ class YouTubeHistoryVisualizer:
 
     def analyze_category_correlations(self):
         """Analyze correlations between different content categories."""
+        plt, sns = self._plotting()
         # Create category presence matrix
         category_stats = pd.read_csv(self.stats_dir / 'category_stats.csv')
         categories = category_stats['category'].tolist()
         
-        # Initialize correlation matrix with zeros
-        correlation_matrix = np.zeros((len(categories), len(categories)))
+        # Videos in both categories, for every pair, from the real categorization
+        both = self.context.category_cooccurrence.reindex(
+            index=categories, columns=categories, fill_value=0).to_numpy()
         
-        # Calculate correlations
-        for i, cat1 in enumerate(categories):
-            for j, cat2 in enumerate(categories):
-                # Count videos containing both categories
-                videos_cat1 = self.df[self.df['Video Title'].str.contains(cat1, case=False, na=False)]
-                videos_cat2 = self.df[self.df['Video Title'].str.contains(cat2, case=False, na=False)]
-                both = len(set(videos_cat1.index) & set(videos_cat2.index))
-                
-                # Calculate Jaccard similarity
-                union = len(set(videos_cat1.index) | set(videos_cat2.index))
-                correlation = both / union if union > 0 else 0
-                correlation_matrix[i, j] = correlation
+        # Jaccard similarity: |A ∩ B| / |A ∪ B| for every pair at once
+        sizes = np.diag(both)
+        union = sizes[:, None] + sizes[None, :] - both
+        correlation_matrix = np.divide(both, union, out=np.zeros(both.shape), where=union > 0)
         
         # Create DataFrame for better visualization
         correlation_df = pd.DataFrame(
@@ -256,10 +313,8 @@ class YouTubeHistoryVisualizer:
 
     def analyze_seasonal_patterns(self):
         """Analyze seasonal viewing patterns."""
-        self.df['Month'] = self.df['Watch Date & Time'].dt.month
-        self.df['Year'] = self.df['Watch Date & Time'].dt.year
-        
-        seasonal_views = self.df.groupby(['Year', 'Month']).size().unstack()
+        plt, sns = self._plotting()
+        seasonal_views = self.context.year_month_counts
         normalized_views = seasonal_views.div(seasonal_views.sum(axis=1), axis=0)
         
         plt.figure(figsize=(15, 8))
@@ -272,23 +327,51 @@ class YouTubeHistoryVisualizer:
         plt.close()
 
 def main():
+    parser = argparse.ArgumentParser(description='Write the viewing history stats and figures.')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='aggregate the history in chunks of this many rows '
+                             'instead of loading it whole')
+    filter_group = parser.add_argument_group(
+        'filters', 'report only on matching views, read from the indexed SQLite store; '
+                   'outputs go to results/filtered/')
+    filter_group.add_argument('--start', default=None, help='first date, inclusive (YYYY-MM-DD)')
+    filter_group.add_argument('--end', default=None, help='last date, exclusive (YYYY-MM-DD)')
+    filter_group.add_argument('--month', default=None, help='a single month (YYYY-MM)')
+    filter_group.add_argument('--channel', default=None, help='a single channel name')
+    filter_group.add_argument('--category', default=None, help='a single content category')
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
     project_root = Path(__file__).parent.parent.parent
     data_file = project_root / 'data' / 'processed' / 'youtube_watch_history.csv'
+    cache_path = project_root / 'data' / 'cache' / 'categories.sqlite'
     
-    visualizer = YouTubeHistoryVisualizer(data_file)
+    profiler = profiler_from_args(args)
+    filters = {name: getattr(args, name)
+               for name in ('start', 'end', 'month', 'channel', 'category')
+               if getattr(args, name) is not None}
+    with profiler.stage('load_history') as stage:
+        if filters:
+            visualizer = YouTubeHistoryVisualizer.from_database(data_file, cache_path=cache_path,
+                                                                **filters)
+        else:
+            visualizer = YouTubeHistoryVisualizer(data_file, cache_path=cache_path,
+                                                  chunksize=args.chunksize)
+        stage['rows'] = len(visualizer.context)
+    if filters and not len(visualizer.context):
+        print("No views match the filters")
+        return
     
     # Generate all visualizations and stats
-    visualizer.generate_basic_stats()
-    visualizer.generate_channel_stats()
-    visualizer.plot_daily_views()
-    visualizer.plot_top_channels()
-    visualizer.plot_hourly_distribution()
-    visualizer.plot_weekly_patterns()
-    visualizer.plot_monthly_trends()
-    visualizer.plot_category_distribution()
-    visualizer.create_monthly_heatmap()
-    visualizer.analyze_category_correlations()
-    visualizer.analyze_seasonal_patterns()
+    steps = ['generate_basic_stats', 'generate_channel_stats', 'plot_daily_views',
+             'plot_top_channels', 'plot_hourly_distribution', 'plot_weekly_patterns',
+             'plot_monthly_trends', 'plot_category_distribution', 'create_monthly_heatmap',
+             'analyze_category_correlations', 'analyze_seasonal_patterns']
+    for step in steps:
+        with profiler.stage(f'visualizer.{step}', rows=len(visualizer.context)):
+            getattr(visualizer, step)()
+    if args.run_report:
+        profiler.write_report(args.run_report)
 
 if __name__ == "__main__":
     main()
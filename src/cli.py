@@ -0,0 +1,46 @@
+import argparse
+from pathlib import Path
+
+from .analysis import report
+from .analysis.sessions import add_session_arguments, session_gap_from_args
+from .processing import data_processor
+from .profiling import add_profiling_arguments, profiler_from_args
+
+
+def run_stats(args):
+    project_root = Path(__file__).parent.parent
+    data_file = project_root / 'data' / 'processed' / 'youtube_watch_history.csv'
+    cache_path = project_root / 'data' / 'cache' / 'categories.sqlite'
+
+    profiler = profiler_from_args(args)
+    stats = report.generate_stats(data_file, cache_path=cache_path, profiler=profiler,
+                                  session_gap=session_gap_from_args(args))
+    if args.run_report:
+        profiler.write_report(args.run_report)
+    print(f"{stats['total_videos_watched']} videos from {stats['unique_channels']} channels, "
+          f"{stats['date_range']['start']} to {stats['date_range']['end']}")
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m src.cli',
+                                     description='YouTube watch history analysis.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    process = subparsers.add_parser('process', help='convert a watch history export to CSV')
+    data_processor.add_arguments(process)
+    process.set_defaults(handler=data_processor.run)
+
+    # Only `figures` imports matplotlib and seaborn
+    stats = subparsers.add_parser('stats', help='write the CSV/JSON stats without figures')
+    add_session_arguments(stats)
+    add_profiling_arguments(stats)
+    stats.set_defaults(handler=run_stats)
+
+    figures = subparsers.add_parser('figures', help='write all stats and figures')
+    report.add_arguments(figures)
+    figures.set_defaults(handler=report.run)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
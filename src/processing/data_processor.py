@@ -1,11 +1,181 @@
 from lxml import etree
+import argparse
 import pandas as pd
 from datetime import datetime
 import os
+import re
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 
+from .history_database import HistoryDatabase, history_database_path
+from ..profiling import StageProfiler, add_profiling_arguments, profiler_from_args
+
+CONTENT_CELL_CLASS = "content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1"
+HISTORY_MEMBER_NAMES = ('watch-history.html', 'watch_history.html')
+OUTER_CELL_MARKER = b'<div class="outer-cell'
+CHUNKS_PER_WORKER = 4
+TIME_PATTERN = re.compile(r'\b(\d{1,2}:\d{2}(?::\d{2})?)\b')
+# The year marker ending a Russian date, as in "30 авг. 2024 г."; month
+# abbreviations such as "авг." contain the same letters, so only the
+# trailing marker is stripped
+YEAR_MARKER = re.compile(r'\s*г\.$')
+NORMALIZED_DATE_FORMAT = '%d %B %Y %H:%M:%S'
+DATE_CACHE_SIZE = 65536
+HISTORY_CHUNK_SIZE = 500_000
+
+
+def find_history_member(archive):
+    """Return the name of the watch history page inside a zip archive.
+
+    Works both for a zipped single HTML file and for a full Takeout export,
+    where the page lives under ``Takeout/YouTube.../history/``.
+    """
+    for name in archive.namelist():
+        if name.startswith('__MACOSX/'):
+            continue
+        if name.rsplit('/', 1)[-1] in HISTORY_MEMBER_NAMES:
+            return name
+    raise FileNotFoundError(f"No watch history page found in {archive.filename}")
+
+
+@contextmanager
+def open_history(input_file):
+    """Open a watch history page as a binary stream.
+
+    ``.zip`` archives are read in place: the history member is streamed
+    straight out of the archive without being extracted to disk.
+    """
+    if zipfile.is_zipfile(input_file):
+        with zipfile.ZipFile(input_file) as archive:
+            with archive.open(find_history_member(archive)) as file:
+                yield file
+    else:
+        with open(input_file, 'rb') as file:
+            yield file
+
+
+def split_on_entries(html_bytes, n_chunks):
+    """Split raw HTML into byte ranges that start on an outer-cell boundary.
+
+    Every range holds only whole entries, so each can be parsed on its own.
+    The page header before the first entry is skipped.
+    """
+    starts = []
+    pos = html_bytes.find(OUTER_CELL_MARKER)
+    while pos != -1:
+        starts.append(pos)
+        pos = html_bytes.find(OUTER_CELL_MARKER, pos + 1)
+    if not starts:
+        return []
+
+    step = max(1, -(-len(starts) // n_chunks))
+    bounds = starts[::step] + [len(html_bytes)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _parse_chunk(chunk):
+    """Parse one byte range of entries in a worker process."""
+    tree = etree.HTML(chunk.decode('utf-8'))
+    if tree is None:
+        return []
+    processor = YouTubeHistoryProcessor()
+    return [processor._extract_entry(div)
+            for div in tree.xpath(f'//div[contains(@class, "{CONTENT_CELL_CLASS}")]')]
+
+
+def history_store_path(data_file):
+    """Return the path of the columnar store that sits next to a history CSV."""
+    return Path(data_file).with_suffix('.parquet')
+
+
+def compact_history(df):
+    """Return ``df`` with titles and channels stored as categoricals.
+
+    Each distinct title and channel is then held once, with a small integer
+    code per row, which shrinks large merged histories several times over.
+    Categories keep their order of first appearance so value_counts ties
+    break the same way as on the plain string columns.
+    """
+    df = df.copy(deep=False)
+    for column in ('Video Title', 'Channel Name'):
+        values = df[column]
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            df[column] = pd.Categorical(values, categories=values.dropna().unique())
+    return df
+
+
+def write_history_store(df, data_file):
+    """Write the processed history as Parquet next to its CSV.
+
+    Titles and channels are stored as dictionary-encoded categorical
+    columns (see ``compact_history``) and the watch time as a real
+    timestamp, so loading needs no parsing.
+    """
+    store = compact_history(df.reset_index(drop=True))
+    store['Watch Date & Time'] = pd.to_datetime(store['Watch Date & Time'])
+    store.to_parquet(history_store_path(data_file), index=False)
+
+
+def load_history(data_file):
+    """Load the processed history in its compact form, preferring the store.
+
+    The Parquet store is used when it exists and is not older than the CSV;
+    otherwise the CSV is read and its timestamps are parsed.
+    """
+    data_file = Path(data_file)
+    store = history_store_path(data_file)
+    if store.exists() and (not data_file.exists()
+                           or store.stat().st_mtime >= data_file.stat().st_mtime):
+        return compact_history(pd.read_parquet(store))
+
+    df = pd.read_csv(data_file)
+    df['Watch Date & Time'] = pd.to_datetime(df['Watch Date & Time'])
+    return compact_history(df)
+
+
+def iter_history_chunks(data_file, chunksize=HISTORY_CHUNK_SIZE):
+    """Yield the processed history as DataFrames of at most ``chunksize`` rows.
+
+    Reads from the same source ``load_history`` would, Parquet record
+    batches or CSV chunks, so memory stays bounded by the chunk size.
+    """
+    data_file = Path(data_file)
+    store = history_store_path(data_file)
+    if store.exists() and (not data_file.exists()
+                           or store.stat().st_mtime >= data_file.stat().st_mtime):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(store).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+        return
+
+    for chunk in pd.read_csv(data_file, chunksize=chunksize):
+        chunk['Watch Date & Time'] = pd.to_datetime(chunk['Watch Date & Time'])
+        yield chunk
+
+
+def open_history_database(data_file):
+    """Open the SQLite store of a processed history for filtered queries.
+
+    The store is (re)built from ``load_history`` when it is missing or
+    older than the CSV, so it also works for histories processed without
+    ``--database``.
+    """
+    data_file = Path(data_file)
+    path = history_database_path(data_file)
+    is_stale = (not path.exists()
+                or (data_file.exists() and path.stat().st_mtime < data_file.stat().st_mtime))
+    history_database = HistoryDatabase(path)
+    if is_stale:
+        history_database.write(load_history(data_file))
+    return history_database
+
+
 class YouTubeHistoryProcessor:
-    def __init__(self):
+    def __init__(self, profiler=None):
         self.month_translation = {
             'января': 'January', 'февраля': 'February', 'марта': 'March',
             'апреля': 'April', 'мая': 'May', 'июня': 'June',
@@ -13,14 +183,72 @@ class YouTubeHistoryProcessor:
             'октября': 'October', 'ноября': 'November', 'декабря': 'December',
             'янв.': 'January', 'февр.': 'February', 'мар.': 'March',
             'апр.': 'April', 'май': 'May', 'июн.': 'June',
-            'июл.': 'July', 'авг.': 'August', 'сен.': 'September',
+            'июл.': 'July', 'авг.': 'August', 'сен.': 'September', 'сент.': 'September',
             'окт.': 'October', 'нояб.': 'November', 'дек.': 'December'
         }
+        self._translate_date = lru_cache(maxsize=DATE_CACHE_SIZE)(self._translate_date_part)
+        self.date_failures = 0
+        self.profiler = profiler or StageProfiler()
+
+    def _translate_date_part(self, russian_date):
+        """Rewrite the date part of a Russian timestamp in English.
+
+        Applies the same cleanup as ``convert_russian_date``. Returns None
+        for strings that cannot be split into day, month and year.
+        """
+        russian_date = YEAR_MARKER.sub('', russian_date.replace('\u202f', ' ').strip())
+        parts = russian_date.split(' ')
+        if len(parts) < 3:
+            return None
+
+        day, month_russian, year = parts[0], parts[1], parts[2]
+        month_english = self.month_translation.get(month_russian.lower(), month_russian)
+        return f"{day} {month_english} {year}"
+
+    def _normalize_russian_date(self, russian_date):
+        """Rewrite a raw Russian timestamp as ``NORMALIZED_DATE_FORMAT`` text."""
+        date_part, _, time_part = russian_date.partition(',')
+        english_date = self._translate_date(date_part)
+        if english_date is None:
+            return None
+
+        time_match = TIME_PATTERN.search(time_part)
+        if time_match is None:
+            return f"{english_date} 00:00:00"
+        time_of_day = time_match.group(1)
+        if time_of_day.count(':') == 1:
+            time_of_day += ':00'
+        return f"{english_date} {time_of_day}"
+
+    def convert_russian_dates(self, russian_dates, keep_time=True):
+        """Convert many Russian date strings at once.
+
+        Each distinct raw string is normalised once (the date part is
+        memoised across calls), then the whole batch goes through a single
+        ``pd.to_datetime`` with an explicit format. Returns the converted
+        datetimes (NaT where parsing failed) and the number of failures.
+        """
+        russian_dates = pd.Series(russian_dates, dtype=object)
+        codes, unique_dates = pd.factorize(russian_dates)
+        normalized = [self._normalize_russian_date(date) if isinstance(date, str) else None
+                      for date in unique_dates]
+
+        converted = pd.to_datetime(pd.Series(normalized, dtype=object),
+                                   format=NORMALIZED_DATE_FORMAT, errors='coerce')
+        if not keep_time:
+            converted = converted.dt.normalize()
+
+        # Missing values are factorized to -1, which maps to a trailing NaT
+        converted = pd.concat([converted, pd.Series([pd.NaT], dtype=converted.dtype)],
+                              ignore_index=True)
+        dates = pd.Series(converted.to_numpy()[codes], index=russian_dates.index)
+        failures = int(dates.isna().sum())
+        return dates, failures
 
     def convert_russian_date(self, russian_date):
         """Convert a Russian date string to a proper datetime format."""
         try:
-            russian_date = russian_date.replace('\u202f', ' ').strip().replace('г.', '').strip()
+            russian_date = YEAR_MARKER.sub('', russian_date.replace('\u202f', ' ').strip())
             parts = russian_date.split(' ')
             if len(parts) < 3:
                 return None
@@ -33,61 +261,246 @@ class YouTubeHistoryProcessor:
             print(f"Error converting date: {e}")
             return None
 
-    def process_history(self, input_file, output_file):
-        """Process YouTube history from HTML to CSV."""
+    def _extract_entry(self, div):
+        """Extract a single watch record from a content-cell div."""
+        video_title = div.xpath('.//a[1]/text()')
+        channel_name = div.xpath('.//a[2]/text()')
+        watch_date_time = div.xpath('.//text()[2]')
+
+        video_title = video_title[0].strip() if video_title else 'Unknown Title'
+        channel_name = channel_name[0].strip() if channel_name else 'Unknown Channel'
+        watch_date_time = watch_date_time[0].strip() if watch_date_time else 'Unknown Date'
+
+        return {
+            'Video Title': video_title,
+            'Channel Name': channel_name,
+            'Watch Date & Time': watch_date_time
+        }
+
+    def _iter_entries(self, input_file):
+        """Yield records from a fully parsed HTML tree."""
         # Read HTML file
-        with open(input_file, 'r', encoding='utf-8') as file:
-            html_data = file.read()
+        with open_history(input_file) as file:
+            html_data = file.read().decode('utf-8')
 
         # Parse HTML
         tree = etree.HTML(html_data)
-        data = []
 
         # Extract data
-        for div in tree.xpath('//div[contains(@class, "content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1")]'):
-            video_title = div.xpath('.//a[1]/text()')
-            channel_name = div.xpath('.//a[2]/text()')
-            watch_date_time = div.xpath('.//text()[2]')
-
-            video_title = video_title[0].strip() if video_title else 'Unknown Title'
-            channel_name = channel_name[0].strip() if channel_name else 'Unknown Channel'
-            watch_date_time = watch_date_time[0].strip() if watch_date_time else 'Unknown Date'
-            watch_date_time = self.convert_russian_date(watch_date_time)
-
-            data.append({
-                'Video Title': video_title,
-                'Channel Name': channel_name,
-                'Watch Date & Time': watch_date_time
-            })
-
-        # Create DataFrame
-        df = pd.DataFrame(data)
-        
-        # Filter invalid entries
-        df = df[
-            (df['Video Title'] != 'Unknown Title') & 
-            (df['Channel Name'] != 'Unknown Channel') & 
-            (df['Watch Date & Time'].notna())
-        ]
+        for div in tree.xpath(f'//div[contains(@class, "{CONTENT_CELL_CLASS}")]'):
+            yield self._extract_entry(div)
+
+    def _iter_entries_streaming(self, input_file):
+        """Yield records incrementally, freeing each element once it is read."""
+        with open_history(input_file) as file:
+            context = etree.iterparse(file, events=('end',), tag='div',
+                                      html=True, encoding='utf-8')
+            for _, div in context:
+                if CONTENT_CELL_CLASS in (div.get('class') or ''):
+                    yield self._extract_entry(div)
+
+                # Drop the element and any already processed siblings
+                div.clear()
+                parent = div.getparent()
+                if parent is not None:
+                    while div.getprevious() is not None:
+                        del parent[0]
+            del context
+
+    def _iter_entries_parallel(self, input_file, workers):
+        """Yield records parsed chunk by chunk across worker processes."""
+        with open_history(input_file) as file:
+            html_bytes = file.read()
+
+        ranges = split_on_entries(html_bytes, workers * CHUNKS_PER_WORKER)
+        chunks = [html_bytes[start:end] for start, end in ranges]
+        del html_bytes
+
+        # map() returns chunk results in submission order
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for records in executor.map(_parse_chunk, chunks):
+                yield from records
+
+    def _convert_timestamp(self, russian_date, keep_time=True):
+        """Convert a single raw timestamp, returning None on failure."""
+        normalized = self._normalize_russian_date(russian_date)
+        if normalized is None:
+            return None
+        try:
+            timestamp = pd.Timestamp(datetime.strptime(normalized, NORMALIZED_DATE_FORMAT))
+        except ValueError:
+            return None
+        return timestamp if keep_time else timestamp.normalize()
+
+    def _ingest_new_entries(self, entries, output_file, store, database):
+        """Append the entries newer than those already in ``output_file``.
+
+        The export lists entries newest first, so parsing stops at the first
+        entry older than the stored high-water mark. Entries at the mark
+        itself are matched against the stored (title, channel, timestamp)
+        keys so they are not added twice.
+        """
+        existing = load_history(output_file)
+        timestamps = existing['Watch Date & Time']
+        high_water_mark = timestamps.max()
+        # Histories processed before watch times were kept hold dates only;
+        # new entries follow the stored precision so the keys still match.
+        # An empty history has no precision to follow and keeps the time.
+        keep_time = (timestamps.empty
+                     or bool((timestamps != timestamps.dt.normalize()).any()))
+        at_mark = existing[timestamps == high_water_mark]
+        stored_keys = Counter(zip(at_mark['Video Title'],
+                                  at_mark['Channel Name'].astype(str),
+                                  at_mark['Watch Date & Time']))
+
+        new_entries = []
+        self.date_failures = 0
+        for entry in entries:
+            if (entry['Video Title'] == 'Unknown Title'
+                    or entry['Channel Name'] == 'Unknown Channel'):
+                continue
+            timestamp = self._convert_timestamp(entry['Watch Date & Time'], keep_time)
+            if timestamp is None:
+                self.date_failures += 1
+                continue
+            if timestamp < high_water_mark:
+                break
+
+            key = (entry['Video Title'], entry['Channel Name'], timestamp)
+            if stored_keys[key] > 0:
+                stored_keys[key] -= 1
+                continue
+            new_entries.append({**entry, 'Watch Date & Time': timestamp})
+
+        df = pd.DataFrame(new_entries, columns=list(existing.columns))
+        if not df.empty:
+            df.to_csv(output_file, mode='a', header=False, index=False)
+            if store:
+                write_history_store(pd.concat([existing, df], ignore_index=True), output_file)
+            if database:
+                self._append_to_database(existing, df, output_file)
+        return df
+
+    def _append_to_database(self, existing, df, output_file):
+        """Append new entries to the SQLite store, building it if it is missing."""
+        path = history_database_path(output_file)
+        is_new = not path.exists()
+        history_database = HistoryDatabase(path)
+        try:
+            if is_new or len(history_database) != len(existing):
+                history_database.write(pd.concat([existing, df], ignore_index=True))
+            else:
+                history_database.append(df)
+        finally:
+            history_database.close()
+
+    def process_history(self, input_file, output_file, streaming=False, workers=1,
+                        store=True, incremental=False, database=False):
+        """Process YouTube history from HTML to CSV.
+
+        ``input_file`` may be the HTML page itself or a ``.zip`` archive
+        containing it (such as a Google Takeout export). With
+        ``streaming=True`` the HTML is parsed incrementally so memory stays
+        flat regardless of the export size. With ``workers > 1`` the page is
+        split on entry boundaries and parsed in that many processes. Unless
+        ``store=False``, a Parquet copy is written next to the CSV (see
+        ``load_history``). With ``database=True`` the history is also
+        written to an indexed SQLite store for filtered queries (see
+        ``HistoryDatabase``).
+
+        With ``incremental=True`` and an existing ``output_file``, only the
+        entries newer than the stored history are parsed and appended; the
+        returned DataFrame then holds just those new entries.
+        """
+        if streaming and workers > 1:
+            raise ValueError("streaming and parallel parsing cannot be combined")
+
+        if workers > 1:
+            entries = self._iter_entries_parallel(input_file, workers)
+        elif streaming:
+            entries = self._iter_entries_streaming(input_file)
+        else:
+            entries = self._iter_entries(input_file)
+
+        profiler = self.profiler
+        if incremental and Path(output_file).exists():
+            with profiler.stage('process_history.ingest_new') as stage:
+                df = self._ingest_new_entries(entries, output_file, store, database)
+                stage['rows'] = len(df)
+            return df
+
+        # Create DataFrame; entries are parsed lazily, so this is the parse stage
+        with profiler.stage('process_history.parse') as stage:
+            df = pd.DataFrame(list(entries))
+            stage['rows'] = len(df)
+
+        # Filter entries without a title or channel
+        with profiler.stage('process_history.filter', rows=len(df)):
+            df = df[
+                (df['Video Title'] != 'Unknown Title') & 
+                (df['Channel Name'] != 'Unknown Channel')
+            ].copy()
+
+        # Convert dates in one batch and drop the ones that failed
+        with profiler.stage('process_history.convert_dates', rows=len(df)):
+            df['Watch Date & Time'], self.date_failures = self.convert_russian_dates(
+                df['Watch Date & Time']
+            )
+            df = df[df['Watch Date & Time'].notna()]
 
         # Save to CSV
-        df.to_csv(output_file, index=False)
+        with profiler.stage('process_history.write_csv', rows=len(df)):
+            df.to_csv(output_file, index=False)
+        if store:
+            with profiler.stage('process_history.write_store', rows=len(df)):
+                write_history_store(df, output_file)
+        if database:
+            with profiler.stage('process_history.write_database', rows=len(df)):
+                history_database = HistoryDatabase(history_database_path(output_file))
+                history_database.write(df)
+                history_database.close()
         return df
 
-def main():
+def add_arguments(parser):
+    parser.add_argument('--input', type=Path, default=None,
+                        help='watch history HTML page or a .zip/Takeout archive containing it')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='path of the CSV file to write')
+    parser.add_argument('--streaming', action='store_true',
+                        help='parse the HTML incrementally to keep memory usage flat')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only append entries newer than the existing processed history')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes used to parse the HTML')
+    parser.add_argument('--database', action='store_true',
+                        help='also write an indexed SQLite store for filtered queries')
+    add_profiling_arguments(parser)
+
+def run(args):
     # Get project root directory
     project_root = Path(__file__).parent.parent.parent
     
     # Set up file paths
-    input_file = project_root / 'data' / 'raw' / 'watch_history.html'
-    output_file = project_root / 'data' / 'processed' / 'youtube_watch_history.csv'
+    input_file = args.input or project_root / 'data' / 'raw' / 'watch_history.html'
+    output_file = args.output or project_root / 'data' / 'processed' / 'youtube_watch_history.csv'
 
     # Process data
-    processor = YouTubeHistoryProcessor()
-    df = processor.process_history(input_file, output_file)
+    processor = YouTubeHistoryProcessor(profiler=profiler_from_args(args))
+    df = processor.process_history(input_file, output_file,
+                                   streaming=args.streaming, workers=args.workers,
+                                   incremental=args.incremental, database=args.database)
+    if args.run_report:
+        processor.profiler.write_report(args.run_report)
     print("Data processing completed successfully!")
+    if processor.date_failures:
+        print(f"Skipped {processor.date_failures} entries with unparseable dates")
     print("\nFirst few rows of processed data:")
     print(df.head())
 
+def main():
+    parser = argparse.ArgumentParser(description='Convert a YouTube watch history export to CSV.')
+    add_arguments(parser)
+    run(parser.parse_args())
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,242 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['Video Title', 'Channel Name', 'Watch Date & Time']
+
+
+def history_database_path(data_file):
+    """Return the path of the SQLite store that sits next to a history CSV."""
+    return Path(data_file).with_suffix('.sqlite')
+
+
+def _year_month(value):
+    """Turn ``'2023-03'`` or any timestamp into the ``year_month`` key 202303."""
+    timestamp = pd.Timestamp(value)
+    return timestamp.year * 100 + timestamp.month
+
+
+def _seconds(value):
+    """Return a naive timestamp as Unix seconds, the unit of ``watched_at``."""
+    return int(pd.Timestamp(value).to_datetime64().astype('datetime64[s]').astype(np.int64))
+
+
+def _rows(df):
+    """Yield ``(title, channel, watched_at, year_month)`` tuples for ``executemany``."""
+    timestamps = pd.to_datetime(df['Watch Date & Time'])
+    watched_at = timestamps.to_numpy(dtype='datetime64[s]').astype(np.int64)
+    year_month = (timestamps.dt.year * 100 + timestamps.dt.month).to_numpy(dtype=np.int64)
+    return zip(df['Video Title'].astype(object).tolist(),
+               df['Channel Name'].astype(object).tolist(),
+               watched_at.tolist(), year_month.tolist())
+
+
+class HistoryDatabase:
+    """Indexed SQLite copy of the processed history for filtered queries.
+
+    One row per view, in the order of the processed CSV, with the watch
+    time as Unix seconds. ``watched_at``, ``(channel, watched_at)`` and
+    ``year_month`` are indexed, so date range, month and channel filters
+    read only the matching rows instead of loading the whole history.
+
+    Category filters need each row's category bitmask (see
+    ``pack_categories``); ``categorize`` fills them in with an analyzer and
+    records its pattern fingerprint, so they are recomputed when the
+    patterns change.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly by _transaction
+        self.connection = sqlite3.connect(self.path, isolation_level=None)
+        with self._transaction():
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)'
+            )
+            self._create_table()
+
+    @contextmanager
+    def _transaction(self):
+        """Run the block in one explicit transaction, schema changes included.
+
+        sqlite3's default mode commits before DROP and CREATE statements,
+        so a failed ``write`` would lose the stored history; here any
+        failure rolls the whole block back.
+        """
+        self.connection.execute('BEGIN')
+        try:
+            yield
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+    def _create_table(self):
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS history ('
+            'id INTEGER PRIMARY KEY, title TEXT NOT NULL, channel TEXT NOT NULL, '
+            'watched_at INTEGER NOT NULL, year_month INTEGER NOT NULL, categories INTEGER)'
+        )
+
+    def _create_indexes(self):
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS history_watched_at ON history (watched_at)'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS history_channel ON history (channel, watched_at)'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS history_year_month ON history (year_month)'
+        )
+
+    def write(self, df):
+        """Replace the stored history with ``df`` in a single transaction.
+
+        The table is rebuilt and the indexes are created after the bulk
+        insert, which is much faster than maintaining them row by row. The
+        rows are left uncategorized until ``categorize`` runs again.
+        """
+        with self._transaction():
+            self.connection.execute('DROP TABLE IF EXISTS history')
+            self.connection.execute(
+                "DELETE FROM meta WHERE key IN ('fingerprint', 'category_columns')"
+            )
+            self._create_table()
+            self.connection.executemany(
+                'INSERT INTO history (title, channel, watched_at, year_month) '
+                'VALUES (?, ?, ?, ?)', _rows(df)
+            )
+            self._create_indexes()
+
+    def append(self, df):
+        """Append the rows of ``df`` in a single transaction."""
+        with self._transaction():
+            self.connection.executemany(
+                'INSERT INTO history (title, channel, watched_at, year_month) '
+                'VALUES (?, ?, ?, ?)', _rows(df)
+            )
+            self._create_indexes()
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+
+    def categorize(self, analyzer):
+        """Store the category bitmask of every row that does not have one yet.
+
+        Each distinct uncategorized title goes through
+        ``analyzer.categorize_masks`` once, which uses its category cache.
+        If the stored masks were computed with different patterns, all of
+        them are recomputed.
+        """
+        meta = dict(self.connection.execute('SELECT key, value FROM meta'))
+        with self._transaction():
+            if meta.get('fingerprint') != analyzer.patterns_fingerprint:
+                self.connection.execute('UPDATE history SET categories = NULL')
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                    [('fingerprint', analyzer.patterns_fingerprint),
+                     ('category_columns', json.dumps(analyzer.category_columns))]
+                )
+
+            titles = [title for title, in self.connection.execute(
+                'SELECT DISTINCT title FROM history WHERE categories IS NULL'
+            )]
+            if not titles:
+                return
+            masks = analyzer.categorize_masks(pd.DataFrame({'Video Title': titles}))
+
+            # One pass over the table, looking each title up in a keyed temp table
+            self.connection.execute(
+                'CREATE TEMP TABLE new_categories (title TEXT PRIMARY KEY, mask INTEGER)'
+            )
+            self.connection.executemany('INSERT INTO new_categories VALUES (?, ?)',
+                                        zip(titles, masks.astype(np.int64).tolist()))
+            self.connection.execute(
+                'UPDATE history SET categories = '
+                '(SELECT mask FROM new_categories WHERE new_categories.title = history.title) '
+                'WHERE categories IS NULL'
+            )
+            self.connection.execute('DROP TABLE new_categories')
+
+    def _where(self, start=None, end=None, month=None, channel=None, category=None):
+        """Build the WHERE clause and parameters shared by the queries."""
+        conditions, params = [], []
+        if start is not None:
+            conditions.append('watched_at >= ?')
+            params.append(_seconds(start))
+        if end is not None:
+            conditions.append('watched_at < ?')
+            params.append(_seconds(end))
+        if month is not None:
+            conditions.append('year_month = ?')
+            params.append(_year_month(month))
+        if channel is not None:
+            conditions.append('channel = ?')
+            params.append(channel)
+        if category is not None:
+            row = self.connection.execute(
+                "SELECT value FROM meta WHERE key = 'category_columns'"
+            ).fetchone()
+            if row is None:
+                raise ValueError("category filters need categorize() to be run first")
+            columns = json.loads(row[0])
+            if category not in columns:
+                raise ValueError(f"Unknown category {category!r}")
+            conditions.append('categories & ? != 0')
+            params.append(1 << columns.index(category))
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        return where, params
+
+    def query(self, start=None, end=None, month=None, channel=None, category=None,
+              limit=None):
+        """Return the views matching every given filter, in history order.
+
+        ``start`` is inclusive and ``end`` exclusive; ``month`` is a
+        ``'YYYY-MM'`` string. The frame has the columns of the processed
+        history, with titles and channels as categoricals like
+        ``load_history`` returns.
+        """
+        where, params = self._where(start, end, month, channel, category)
+        sql = f'SELECT title, channel, watched_at FROM history{where} ORDER BY id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        rows = self.connection.execute(sql, params).fetchall()
+        df = pd.DataFrame(rows, columns=COLUMNS)
+        df['Watch Date & Time'] = pd.to_datetime(df['Watch Date & Time'].astype(np.int64),
+                                                 unit='s')
+        for column in ('Video Title', 'Channel Name'):
+            values = df[column]
+            df[column] = pd.Categorical(values, categories=values.unique())
+        return df
+
+    def count(self, **filters):
+        """Return the number of views matching ``filters`` (see ``query``)."""
+        where, params = self._where(**filters)
+        return self.connection.execute(f'SELECT COUNT(*) FROM history{where}',
+                                       params).fetchone()[0]
+
+    def top_channels(self, n=10, **filters):
+        """Return the ``n`` most watched channels among the views matching ``filters``.
+
+        Ties are broken by first appearance in the history, like
+        ``AnalysisContext.channel_counts``.
+        """
+        where, params = self._where(**filters)
+        rows = self.connection.execute(
+            f'SELECT channel, COUNT(*) AS views FROM history{where} '
+            'GROUP BY channel ORDER BY views DESC, MIN(id) LIMIT ?', params + [n]
+        ).fetchall()
+        return pd.Series([views for _, views in rows],
+                         index=pd.Index([channel for channel, _ in rows], name='Channel Name'),
+                         name='count', dtype=np.int64)
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,96 @@
+import cProfile
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+class StageProfiler:
+    """Record wall time, CPU time, peak memory and row counts per stage.
+
+    Wrap each stage in ``with profiler.stage(name, rows=...)``; the record
+    it yields can be updated, e.g. with ``rows``, once the count is known.
+    Wall and CPU time are always recorded. With ``trace_memory=True`` the
+    peak of traced allocations during each stage (Python objects and numpy
+    buffers, as seen by ``tracemalloc``) is recorded too; it slows the run
+    down, so it is off by default. With ``profile_dir`` each top-level stage
+    is also run under cProfile and its stats dumped to ``<stage>.prof``.
+    """
+
+    def __init__(self, trace_memory=False, profile_dir=None):
+        self.trace_memory = trace_memory
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.stages = []
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self._depth = 0
+        self._peaks = []  # traced memory peaks of the open stages, innermost last
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        record = {'stage': name, 'seconds': None, 'cpu_seconds': None, 'rows': rows}
+        self.stages.append(record)
+        self._depth += 1
+
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if self._peaks:
+                # reset_peak() below would lose the enclosing stage's peak so far
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+
+        # Only one cProfile profiler can be active at a time
+        profile = None
+        if self.profile_dir and self._depth == 1:
+            profile = cProfile.Profile()
+            profile.enable()
+
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            record['cpu_seconds'] = time.process_time() - cpu_start
+            self._depth -= 1
+
+            if profile is not None:
+                profile.disable()
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                profile.dump_stats(self.profile_dir / f'{name}.prof')
+
+            if self.trace_memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                record['peak_memory_mb'] = peak / 2**20
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+
+    def report(self):
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'seconds': time.perf_counter() - self._start,
+            'stages': self.stages,
+        }
+
+    def write_report(self, path):
+        """Write the recorded stages to ``path`` as a JSON run report."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=4)
+
+
+def add_profiling_arguments(parser):
+    parser.add_argument('--run-report', type=Path, default=None,
+                        help='write per-stage time, memory and row counts to this JSON file')
+    parser.add_argument('--profile', type=Path, default=None, metavar='DIR',
+                        help='dump cProfile stats for each stage into this directory')
+
+
+def profiler_from_args(args):
+    """Build the profiler requested by ``add_profiling_arguments`` options."""
+    return StageProfiler(trace_memory=args.run_report is not None, profile_dir=args.profile)